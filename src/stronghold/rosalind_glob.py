@@ -10,9 +10,8 @@ import strings
 def main(argv):
     blosom62 = table.scoring(argv[0])
     s, t     = fasta.read_ordered(argv[1])
-    m, n     = len(s), len(t)
 
-    print strings.alignment_table(s, t, blosom62)[m][n]
+    print strings.optimal_alignment(s, t, blosom62, score_only = True)
 
 
 if __name__ == "__main__":
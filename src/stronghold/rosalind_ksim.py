@@ -3,47 +3,22 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../tools'))
 
 import files
-
-
-def update_table(D, s, t, k):
-    m = len(s)
-    n = len(t)
-
-    for i in xrange(1, m + 1):
-        start = max(1, i - k)
-        end   = min(n, i + k)
-        for j in xrange(start, end + 1):
-            D[i][j] = max(D[i - 1][j - 1] + (0 if s[i - 1] == t[j - 1] else -1), D[i - 1][j] - 1, D[i][j - 1] - 1)
-
-
-def create_matrix(m, k):
-    D       = [[-float('Inf') for _ in xrange(m + k + 1)] for _ in xrange(m + 1)]
-
-    D[0][0] = 0
-
-    for i in xrange(1, m + 1):
-        D[i][0] = -i
-
-    for j in xrange(1, m + k + 1):
-        D[0][j] = -j
-
-    return D
+import distance
 
 
 def similar_motifs(s, t, k):
     m = len(s)
     n = len(t)
 
-    D = create_matrix(m, k)
-    F = []
+    F = set()
 
-    for i in xrange(0, n - (m + k) + 1):
-        update_table(D, s, t[i:i + (m + k)], k)
-        for j in xrange(m - k, m + k + 1):
-            if D[m][j] >= -k:
-                F.append((i + 1, j))
+    for end in distance.approximate_ends(s, t, k):
+        window = t[max(0, end - (m + k)):end][::-1]
+        for length, score in enumerate(distance.edit_scores(s[::-1], window), 1):
+            if score <= k and length >= m - k and end - length <= n - (m + k):
+                F.add((end - length + 1, length))
 
-    return F
+    return sorted(F)
 
 
 def main(argv):
@@ -12,9 +12,9 @@ def main(argv):
     N    = len(dna)
 
 
-    sa   = arrays.suffix_array(dna)
-    lcp  = arrays.lcp_array(sa)
-    sub1 = sum(len(sa[i][1][:-1]) - lcp[i][1] for i in xrange(1, N + 1))
+    sa   = arrays.integer_suffix_array(dna)
+    lcp  = arrays.kasai_lcp_array(dna, sa)
+    sub1 = sum(N - sa[i] - lcp[i] for i in xrange(1, N + 1))
 
 
     st   = tree.SuffixTree(dna)
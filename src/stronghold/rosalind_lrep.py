@@ -11,11 +11,10 @@ def main(argv):
 
     s     = data[0]
     k     = int(data[1])
-    edges = data[2:]
 
-    root  = tree.build_suffix_tree(s, edges)
+    st    = tree.SuffixTree(s)
 
-    print max(tree.longest_substring(root, k), key = len)
+    print st.longest_repeats(k)[0]
 
 
 if __name__ == "__main__":
@@ -14,11 +14,7 @@ def main(argv):
     print st.longest_repeat()
 
 
-    sa    = arrays.suffix_array(text + '$')
-    ha    = arrays.lcp_array(sa)
-    index = max(ha, key = lambda x: x[1])
-
-    print text[sa[index[0]][0]:sa[index[0]][0] + index[1]]
+    print arrays.LCPIndex(text).longest_repeat()
 
 
 if __name__ == "__main__":
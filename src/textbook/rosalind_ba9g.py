@@ -8,9 +8,9 @@ import arrays
 
 def main(argv):
     text = files.read_line(argv[0])
-    sa   = arrays.suffix_array(text)
+    sa   = arrays.integer_suffix_array(text)
 
-    print ', '.join(str(v[0]) for v in sa)
+    print ', '.join(str(v) for v in sa)
 
 
 if __name__ == "__main__":
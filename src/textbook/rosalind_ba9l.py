@@ -3,7 +3,6 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../tools'))
 
 import files
-import arrays
 import strings
 
 
@@ -13,13 +12,11 @@ def main(argv):
     text     = lines[0][0]
     patterns = lines[1]
 
-    last     = arrays.indexed_text_array(text)
-    first    = arrays.indexed_text_array(''.join(sorted(text)))
-    ltof     = arrays.last_to_first(first, last)
+    index    = strings.FMIndex(text)
 
     matches  = []
     for pattern in patterns:
-        matches.append(strings.burrows_wheeler_matching(pattern, first, last, ltof))
+        matches.append(index.count(pattern))
 
     print ' '.join(str(match) for match in matches)
 
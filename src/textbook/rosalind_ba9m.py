@@ -3,7 +3,6 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../tools'))
 
 import files
-import arrays
 import strings
 
 
@@ -13,12 +12,11 @@ def main(argv):
     text     = lines[0][0]
     patterns = lines[1]
 
-    cm       = arrays.count_matrix(text)
-    fo       = arrays.first_occurrence(''.join(sorted(text)))
+    index    = strings.FMIndex(text)
 
     matches  = []
     for pattern in patterns:
-        matches.append(strings.better_burrows_wheeler_matching(pattern, text, cm, fo))
+        matches.append(index.count(pattern))
 
     print ' '.join(str(match) for match in matches)
 
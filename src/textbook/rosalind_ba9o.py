@@ -3,7 +3,6 @@ import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '../tools'))
 
 import files
-import arrays
 import strings
 
 
@@ -14,20 +13,14 @@ def main(argv):
     patterns = lines[1].split()
     d        = int(lines[2])
 
-    bwt      = strings.burrows_wheeler_transform(text)
-    first    = ''.join(sorted(text))
-    k        = len(patterns[0]) + 1
+    if len(argv) > 2:
+        strings.cached_fm_index(text, argv[1])
+        located = strings.batch_matches(argv[1], patterns, d, text, processes = int(argv[2]))
+    else:
+        index   = strings.cached_fm_index(text, argv[1]) if len(argv) > 1 else strings.fm_index(text)
+        located = index.approximate_many(patterns, d)
 
-    cm       = arrays.checkpoint_matrix(bwt, k)
-    fo       = arrays.first_occurrence(first)
-    psa      = {i:v for i, v in arrays.partial_suffix_array(text, k)}
-
-    ifirst   = arrays.indexed_text_array(first)
-    ilast    = arrays.indexed_text_array(bwt)
-
-    seeds    = []
-    for pattern in patterns:
-        seeds.extend(strings.multiple_approximate_pattern_matching(d, pattern, text, bwt, cm, fo, psa, ifirst, ilast, k))
+    seeds    = [match for locations in located for match in locations]
 
     print ' '.join(str(match) for match in sorted(seeds))
 
@@ -1,4 +1,7 @@
-from collections import defaultdict
+from array       import array
+from collections import defaultdict, deque
+
+import numpy as np
 
 
 def frequency_table(A):
@@ -104,28 +107,11 @@ def last_to_first(first, last):
 
 
 def count_matrix(last):
-    row = {c: 0 for c in last}
-    c   = [row.copy()]
-
-    for l in last:
-        row[l] += 1
-        c.append(row.copy())
-
-    return c
+    return RankMatrix(last)
 
 
 def checkpoint_matrix(last, k):
-    row = {c: 0 for c in last}
-    i   = 0
-    c   = {i:row.copy()}
-
-    for l in last:
-        i      += 1
-        row[l] += 1
-        if i % k == 0:
-            c[i] = row.copy()
-
-    return c
+    return RankMatrix(last, k)
 
 
 def first_occurrence(first):
@@ -140,41 +126,417 @@ def first_occurrence(first):
 
 
 
+WORD_BITS  = 64
+SUPER_BITS = 512
+
+
+def popcounts(words):
+    return np.unpackbits(words.view(np.uint8)).reshape(-1, WORD_BITS).sum(axis = 1)
+
+
+
+class BitVector:
+
+    def __init__(self, bits):
+        bits        = np.asarray(bits, dtype = bool)
+        self.length = len(bits)
+
+        padded      = np.zeros(-(-self.length // SUPER_BITS) * SUPER_BITS or SUPER_BITS, dtype = bool)
+        padded[:self.length] = bits
+
+        self.words  = np.packbits(padded.reshape(-1, 8)[:, ::-1], axis = 1).ravel().view('<u8')
+        counts      = popcounts(self.words).reshape(-1, SUPER_BITS // WORD_BITS)
+        inside      = np.cumsum(counts, axis = 1) - counts
+
+        self.blocks = inside.ravel().astype(np.uint16)
+        self.supers = np.concatenate(([0], np.cumsum(counts.sum(axis = 1))[:-1])).astype(np.int64)
+        self.ones   = int(counts.sum())
+
+
+    def __len__(self):
+        return self.length
+
+
+    def __getitem__(self, i):
+        return int(self.words[i >> 6]) >> (i & 63) & 1
+
+
+    def rank(self, bit, i):
+        word = i >> 6
+        ones = int(self.supers[word >> 3]) + int(self.blocks[word]) + bin(int(self.words[word]) & ((1 << (i & 63)) - 1)).count('1') if i < self.length else self.ones
+
+        return ones if bit else i - ones
+
+
+    def select(self, bit, j):
+        if not 0 <= j < (self.ones if bit else self.length - self.ones):
+            raise ValueError('bit vector has no %s-bit number %s' % (bit, j))
+
+        low, high = 0, len(self.supers) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            before = int(self.supers[middle]) if bit else middle * SUPER_BITS - int(self.supers[middle])
+            if before <= j:
+                low = middle
+            else:
+                high = middle - 1
+
+        word = low * (SUPER_BITS // WORD_BITS)
+        j   -= int(self.supers[low]) if bit else low * SUPER_BITS - int(self.supers[low])
+
+        while True:
+            value = int(self.words[word])
+            if not bit:
+                value ^= (1 << WORD_BITS) - 1
+            count = bin(value).count('1')
+            if j < count:
+                break
+            j    -= count
+            word += 1
+
+        for offset in xrange(WORD_BITS):
+            if value >> offset & 1:
+                if j == 0:
+                    return word * WORD_BITS + offset
+                j -= 1
+
+
+
+class WaveletMatrix:
+
+    def __init__(self, sequence, alphabet = None):
+        self.symbols = sorted(set(sequence)) if alphabet is None else list(alphabet)
+        self.codes   = dict((symbol, code) for code, symbol in enumerate(self.symbols))
+        self.length  = len(sequence)
+        self.depth   = max(1, (len(self.symbols) - 1).bit_length())
+        self.levels  = []
+
+        if isinstance(sequence, str):
+            table = np.zeros(256, dtype = np.int64)
+            for symbol, code in self.codes.iteritems():
+                table[ord(symbol)] = code
+            codes = table[np.frombuffer(sequence, dtype = np.uint8)]
+        else:
+            codes = np.array([self.codes[symbol] for symbol in sequence], dtype = np.int64)
+
+        for shift in xrange(self.depth - 1, -1, -1):
+            bits  = (codes >> shift) & 1 == 1
+            self.levels.append((BitVector(bits), int(len(bits) - bits.sum())))
+            codes = np.concatenate((codes[~bits], codes[bits]))
+
+
+    def __len__(self):
+        return self.length
+
+
+    def __getitem__(self, i):
+        code = 0
+
+        for level, zeros in self.levels:
+            bit  = level[i]
+            code = code << 1 | bit
+            i    = zeros + level.rank(1, i) if bit else level.rank(0, i)
+
+        return self.symbols[code]
+
+
+    def interval(self, symbol, start, end):
+        code = self.codes[symbol]
+        path = []
+
+        for depth, (level, zeros) in enumerate(self.levels):
+            bit = code >> (self.depth - 1 - depth) & 1
+            path.append(bit)
+            if bit:
+                start, end = zeros + level.rank(1, start), zeros + level.rank(1, end)
+            else:
+                start, end = level.rank(0, start), level.rank(0, end)
+
+        return start, end, path
+
+
+    def rank(self, symbol, i):
+        if symbol not in self.codes:
+            return 0
+
+        start, end, _ = self.interval(symbol, 0, i)
+
+        return end - start
+
+
+    def select(self, symbol, j):
+        if symbol not in self.codes:
+            raise ValueError('sequence has no symbol %s' % symbol)
+
+        start, end, path = self.interval(symbol, 0, self.length)
+
+        if not 0 <= j < end - start:
+            raise ValueError('sequence has no occurrence %s of %s' % (j, symbol))
+
+        position = start + j
+        for (level, zeros), bit in reversed(zip(self.levels, path)):
+            position = level.select(1, position - zeros) if bit else level.select(0, position)
+
+        return position
+
+
+
+class RankMatrix:
+
+    def __init__(self, last, step = 1):
+        self.step    = step
+        self.wavelet = WaveletMatrix(last)
+
+
+    def __len__(self):
+        return len(self.wavelet) // self.step + 1
+
+
+    def __contains__(self, i):
+        return 0 <= i <= len(self.wavelet) and i % self.step == 0
+
+
+    def __getitem__(self, i):
+        if i not in self:
+            raise KeyError(i)
+
+        return dict((symbol, self.wavelet.rank(symbol, i)) for symbol in self.wavelet.symbols)
+
+
 
+def int_array(values):
+    result = array('i')
+    result.fromstring(np.asarray(values, dtype = np.intc).tostring())
+
+    return result
+
+
+def integer_suffix_array(string):
+    if isinstance(string, str):
+        if string[-1] != '$':
+            string += '$'
+        rank = np.frombuffer(string, dtype = np.uint8).astype(np.int64)
+    else:
+        rank = np.asarray(string, dtype = np.int64)
+
+    n     = len(rank)
+    order = np.argsort(rank, kind = 'mergesort')
+    k     = 1
+
+    while k < n:
+        second = np.concatenate((rank[k:], np.full(k, -1, dtype = np.int64)))
+        order  = np.lexsort((second, rank))
+
+        first  = rank[order]
+        last   = second[order]
+        steps  = (first[1:] != first[:-1]) | (last[1:] != last[:-1])
+
+        rank   = np.empty(n, dtype = np.int64)
+        rank[order] = np.concatenate(([0], np.cumsum(steps)))
+
+        if rank[order[-1]] == n - 1:
+            break
+        k *= 2
+
+    return int_array(order)
 
 
 def suffix_array(string):
     if string[-1] != '$':
         string += '$'
 
-    sa = []
-
-    for i in xrange(len(string)):
-        sa.append((i, string[i:]))
-
-    return sorted(sa, key = lambda x: x[1])
+    return [(i, string[i:]) for i in integer_suffix_array(string)]
 
 
 def partial_suffix_array(string, k):
     psa = []
 
-    for index, value in enumerate(suffix_array(string)):
-        if value[0] % k == 0:
-            psa.append((index, value[0]))
+    for index, value in enumerate(integer_suffix_array(string)):
+        if value % k == 0:
+            psa.append((index, value))
 
     return psa
 
 
-def lcp_array(suffix_array):
-    lcp = [(0, -1)]
-
-    for i in xrange(1, len(suffix_array)):
-        string1 = suffix_array[i - 1][1]
-        string2 = suffix_array[i][1]
-        for j in xrange(min(len(string1), len(string2))):
-            if string1[j] != string2[j]:
-                lcp.append((i, j))
-                break
+def kasai_lcp_array(string, sa = None):
+    if isinstance(string, str) and string[-1] != '$':
+        string += '$'
+
+    if sa is None:
+        sa = integer_suffix_array(string)
+
+    n    = len(string)
+    rank = [0] * n
+    lcp  = array('i', [0]) * n
+    h    = 0
+
+    for index, value in enumerate(sa):
+        rank[value] = index
+
+    for i in xrange(n):
+        r = rank[i]
+        if r > 0:
+            j = sa[r - 1]
+            while i + h < n and j + h < n and string[i + h] == string[j + h]:
+                h += 1
+            lcp[r] = h
+            if h > 0:
+                h -= 1
+        else:
+            h = 0
 
     return lcp
 
+
+def lcp_array(suffix_array):
+    string = [value for index, value in suffix_array if index == 0][0]
+    sa     = [index for index, _ in suffix_array]
+    lcp    = kasai_lcp_array(string, sa)
+
+    return [(0, -1)] + [(i, lcp[i]) for i in xrange(1, len(sa))]
+
+
+
+class SparseTable:
+
+    def __init__(self, values):
+        level       = np.asarray(values, dtype = np.int64)
+        self.levels = [level]
+        width       = 1
+
+        while 2 * width <= len(self.levels[0]):
+            level = np.minimum(level[:-width], level[width:])
+            self.levels.append(level)
+            width *= 2
+
+
+    def minimum(self, i, j):
+        level = (j - i + 1).bit_length() - 1
+        table = self.levels[level]
+
+        return int(min(table[i], table[j - (1 << level) + 1]))
+
+
+
+class LCPIndex:
+
+    def __init__(self, string, sa = None):
+        if string[-1] != '$':
+            string += '$'
+
+        self.string = string
+        self.sa     = sa if sa is not None else integer_suffix_array(string)
+        self.lcp    = kasai_lcp_array(string, self.sa)
+        self.rank   = array('i', [0]) * len(self.sa)
+        self._table = SparseTable(self.lcp)
+
+        for index, value in enumerate(self.sa):
+            self.rank[value] = index
+
+
+    def interval_lcp(self, first, last):
+        if first == last:
+            return len(self.string) - self.sa[first]
+
+        return self._table.minimum(first + 1, last)
+
+
+    def longest_common_prefix(self, i, j):
+        if i == j:
+            return len(self.string) - i
+
+        first, last = sorted((self.rank[i], self.rank[j]))
+
+        return self.interval_lcp(first, last)
+
+
+    def longest_repeat(self):
+        index = max(xrange(len(self.lcp)), key = lambda i: self.lcp[i])
+        start = self.sa[index]
+
+        return self.string[start:start + self.lcp[index]]
+
+
+
+class GeneralizedSuffixArray:
+
+    def __init__(self, strings):
+        pieces = []
+        codes  = []
+
+        for index, string in enumerate(strings):
+            pieces.append(string)
+            codes.append(np.frombuffer(string, dtype = np.uint8).astype(np.int64))
+            codes.append(np.array([-1 - index], dtype = np.int64))
+
+        codes        = np.concatenate(codes) if codes else np.zeros(0, dtype = np.int64)
+        lengths      = np.array([len(piece) for piece in pieces], dtype = np.int64)
+
+        self.count   = len(pieces)
+        self.text    = '$'.join(pieces) + '$' if pieces else ''
+        self.starts  = np.concatenate(([0], np.cumsum(lengths + 1)[:-1])).astype(np.int64)
+        self.sa      = integer_suffix_array(codes) if len(codes) else array('i')
+        self.lcp     = kasai_lcp_array(codes.tolist(), self.sa) if len(codes) else array('i')
+
+        owners       = np.repeat(np.arange(self.count), lengths + 1)
+        ends         = np.repeat(self.starts + lengths, lengths + 1)
+        sa           = np.asarray(self.sa, dtype = np.int64)
+
+        self.colors  = int_array(owners[sa]) if len(codes) else array('i')
+        self.lengths = int_array(ends[sa] - sa) if len(codes) else array('i')
+
+
+    def __len__(self):
+        return len(self.sa)
+
+
+    def suffix(self, row, length = None):
+        start = self.sa[row]
+
+        return self.text[start:start + (self.lengths[row] if length is None else length)]
+
+
+    def shared_rows(self, k):
+        seen     = [0] * self.count
+        distinct = 0
+        minimum  = deque()
+        first    = self.count
+        best     = 0
+        rows     = []
+
+        for last in xrange(self.count, len(self.sa)):
+            color = self.colors[last]
+            if not seen[color]:
+                distinct += 1
+            seen[color] += 1
+
+            if last > first:
+                while minimum and self.lcp[minimum[-1]] >= self.lcp[last]:
+                    minimum.pop()
+                minimum.append(last)
+
+            while distinct >= k:
+                length = self.lcp[minimum[0]] if last > first else self.lengths[first]
+
+                if length > best:
+                    best = length
+                    rows = [first]
+                elif length == best and length:
+                    rows.append(first)
+
+                color        = self.colors[first]
+                seen[color] -= 1
+                if not seen[color]:
+                    distinct -= 1
+                first += 1
+
+                if minimum and minimum[0] <= first:
+                    minimum.popleft()
+
+        return best, rows
+
+
+    def longest_shared(self, k):
+        best, rows = self.shared_rows(k)
+
+        return sorted(set(self.suffix(row, best) for row in rows)) if best else []
@@ -1,36 +1,119 @@
 
 
-TRANS = {'A': 'G', 'G': 'A', 'C': 'T', 'T': 'C'}
+import binascii
+
+from collections import defaultdict
+
+import numpy as np
+
+
+TRANS          = {'A': 'G', 'G': 'A', 'C': 'T', 'T': 'C'}
+
+HAMMING_PACKED = 24
+HAMMING_BLOCK  = 256
+
+
+def pack(s):
+    return int(binascii.hexlify(s), 16) if s else 0
 
 
 def hamming(s, t):
-    return sum(x != y for x, y in zip(s, t))
+    length = min(len(s), len(t))
+
+    if length < HAMMING_PACKED or not isinstance(s, str) or not isinstance(t, str):
+        return sum(x != y for x, y in zip(s, t))
+
+    x  = pack(s[:length]) ^ pack(t[:length])
+    x |= x >> 4
+    x |= x >> 2
+    x |= x >> 1
+
+    return bin(x & ((1 << 8 * length) - 1) // 255).count('1')
+
+
+def hamming_within(s, t, d):
+    length = min(len(s), len(t))
+    total  = 0
+
+    for i in xrange(0, length, HAMMING_BLOCK):
+        total += hamming(s[i:i + HAMMING_BLOCK], t[i:i + HAMMING_BLOCK])
+        if total > d:
+            return False
+
+    return True
+
+
+def hamming_windows(pattern, text):
+    k       = len(pattern)
+    windows = len(text) - k + 1
+    dist    = np.zeros(max(windows, 0), dtype = np.int64)
+
+    if windows > 0:
+        text    = np.frombuffer(text, dtype = np.uint8)
+        pattern = np.frombuffer(pattern, dtype = np.uint8)
+        for j in xrange(k):
+            dist += text[j:j + windows] != pattern[j]
+
+    return dist
 
 
 def p(s, t):
     return sum(x != y for x, y in zip(s, t)) / float(len(s))
 
 
-def edit(s, t):
-    m = len(s)
-    n = len(t)
+def match_masks(pattern):
+    masks = defaultdict(int)
 
-    D = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+    for i, symbol in enumerate(pattern):
+        masks[symbol] |= 1 << i
 
-    for i in xrange(1, m + 1):
-        D[i][0] = i
+    return masks
 
-    for j in xrange(1, n + 1):
-        D[0][j] = j
 
-    for j in xrange(1, n + 1):
-        for i in xrange(1, m + 1):
-            if s[i - 1] == t[j - 1]:
-                D[i][j] = D[i - 1][j - 1]
-            else:
-                D[i][j] = min(D[i - 1][j], D[i][j - 1], D[i - 1][j - 1]) + 1
+def edit_scores(pattern, text, anchored = True):
+    m     = len(pattern)
+    mask  = (1 << m) - 1
+    high  = 1 << m >> 1
+    masks = match_masks(pattern)
+
+    pv    = mask
+    mv    = 0
+    score = m
+
+    for symbol in text:
+        eq    = masks.get(symbol, 0)
+        xv    = eq | mv
+        xh    = (((eq & pv) + pv) ^ pv) | eq
+        ph    = mv | ~(xh | pv) & mask
+        mh    = pv & xh
+
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+
+        ph    = ph << 1 | 1 if anchored else ph << 1
+        mh  <<= 1
+        pv    = (mh | ~(xv | ph)) & mask
+        mv    = ph & xv
+
+        yield score
+
+
+def approximate_ends(pattern, text, k):
+    return [j + 1 for j, score in enumerate(edit_scores(pattern, text, False)) if score <= k]
+
+
+def edit(s, t):
+    if len(s) < len(t):
+        s, t = t, s
+
+    score = len(s)
+
+    for score in edit_scores(s, t):
+        pass
 
-    return D[m][n]
+    return score
 
 
 def tt_ratio(s, t):
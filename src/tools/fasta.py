@@ -1,92 +1,210 @@
+import os
+import mmap
+
 from collections import defaultdict
 
 
-def read_ordered(file_path):
-    strings = defaultdict(str)
-    labels  = []
+def lines_in_range(file, start = 0, end = None):
+    if start > 0:
+        file.seek(start - 1)
+        offset = start - 1 + len(file.readline())
+    else:
+        file.seek(0)
+        offset = 0
 
-    with open(file_path) as file:
-        label = None
-        for line in file:
-            line = line.strip()
-            if line.startswith('>'):
-                label = line[1:]
-                labels.append(label)
-            else:
-                strings[label] += line
+    inside = start == 0
 
-    return [strings[label] for label in labels]
+    for line in iter(file.readline, ''):
+        if line.startswith('>'):
+            if end is not None and offset >= end:
+                break
+            inside = True
 
+        if inside:
+            yield line
 
+        offset += len(line)
 
-def read_ordered_from(obj):
-    strings = defaultdict(str)
-    labels  = []
 
-    label = None
+def byte_ranges(file_path, count):
+    size  = os.path.getsize(file_path)
+    step  = -(-size // count) if count > 0 else size
+    edges = range(0, size, step) if step else []
+
+    return [(edge, min(edge + step, size)) for edge in edges]
+
+
+def records_from(obj):
+    label  = None
+    chunks = []
+
     for line in obj:
         line = line.strip()
         if line.startswith('>'):
-            label = line[1:]
-            labels.append(label)
+            if label is not None or chunks:
+                yield label, ''.join(chunks)
+            label  = line[1:]
+            chunks = []
         else:
-            strings[label] += line
+            chunks.append(line)
+
+    if label is not None or chunks:
+        yield label, ''.join(chunks)
+
+
+def records(file_path, start = 0, end = None):
+    with open(file_path) as file:
+        for record in records_from(lines_in_range(file, start, end)):
+            yield record
+
+
+
+def collect(records):
+    strings = defaultdict(str)
+    chunks  = defaultdict(list)
+    labels  = []
+
+    for label, sequence in records:
+        if label is not None:
+            labels.append(label)
+        strings[label]
+        chunks[label].append(sequence)
+
+    for label in chunks:
+        strings[label] = ''.join(chunks[label])
+
+    return strings, labels
+
+
+
+def read_ordered(file_path):
+    strings, labels = collect(records(file_path))
+
+    return [strings[label] for label in labels]
+
+
+
+def read_ordered_from(obj):
+    strings, labels = collect(records_from(obj))
 
     return [strings[label] for label in labels]
 
 
 
 def read(file_path):
-    strings = defaultdict(str)
+    return collect(records(file_path))[0]
 
-    with open(file_path) as file:
-        label = None
-        for line in file:
-            line = line.strip()
+
+
+def read_from(obj):
+    return collect(records_from(obj))[0]
+
+
+
+def read_one(file_path):
+    return ''.join(sequence for _, sequence in records(file_path))
+
+
+
+def read_one_from(obj):
+    return ''.join(sequence for _, sequence in records_from(obj))
+
+
+
+def build_index(file_path):
+    index  = []
+    offset = 0
+    entry  = None
+
+    with open(file_path, 'rb') as file:
+        for line in iter(file.readline, ''):
             if line.startswith('>'):
-                label = line[1:]
+                entry    = [line[1:].strip(), 0, offset + len(line), 0, 0]
+                previous = None
+                index.append(entry)
+            elif entry is not None:
+                bases = len(line.rstrip('\r\n'))
+                if not entry[3]:
+                    entry[3] = bases
+                    entry[4] = len(line)
+                elif previous != (entry[3], entry[4]) or bases > entry[3]:
+                    raise ValueError('uneven line lengths in record %s' % entry[0])
+                previous  = (bases, len(line))
+                entry[1] += bases
+            offset += len(line)
+
+    return [tuple(entry) for entry in index]
+
+
+def write_index(file_path, index):
+    with open(file_path + '.fai', 'w') as file:
+        for entry in index:
+            file.write('\t'.join(str(value) for value in entry) + '\n')
+
+
+def read_index(file_path):
+    index = []
+
+    with open(file_path + '.fai') as file:
+        for line in file:
+            values = line.rstrip('\n').split('\t')
+            index.append((values[0],) + tuple(int(value) for value in values[1:]))
+
+    return index
+
+
+
+class IndexedFasta:
+
+    def __init__(self, file_path, index = None):
+        if index is None:
+            if os.path.exists(file_path + '.fai'):
+                index = read_index(file_path)
             else:
-                strings[label] += line
+                index = build_index(file_path)
 
-    return strings
+        self._file   = open(file_path, 'rb')
+        self._map    = mmap.mmap(self._file.fileno(), 0, access = mmap.ACCESS_READ) if os.path.getsize(file_path) else ''
+        self._index  = dict((entry[0], entry[1:]) for entry in index)
+        self._labels = [entry[0] for entry in index]
 
 
+    def labels(self):
+        return list(self._labels)
 
-def read_from(obj):
-    strings = defaultdict(str)
 
-    label = None
-    for line in obj:
-        line = line.strip()
-        if line.startswith('>'):
-            label = line[1:]
-        else:
-            strings[label] += line
+    def length(self, label):
+        return self._index[label][0]
 
-    return strings
 
+    def fetch(self, label, start = 0, end = None):
+        length, offset, bases, width = self._index[label]
 
+        if end is None or end > length:
+            end = length
 
-def read_one(file_path):
-    string = ''
+        if start >= end:
+            return ''
 
-    with open(file_path) as file:
-        for line in file:
-            line = line.strip()
-            if not line.startswith('>'):
-                string += line
+        first = offset + (start // bases) * width + start % bases
+        last  = offset + ((end - 1) // bases) * width + (end - 1) % bases + 1
 
-    return string
+        return self._map[first:last].replace('\n', '').replace('\r', '')
 
 
+    def read_one(self):
+        return ''.join(self.fetch(label) for label in self._labels)
 
-def read_one_from(obj):
-    string = ''
 
-    for line in obj:
-        line = line.strip()
-        if not line.startswith('>'):
-            string += line
+    def close(self):
+        if self._map:
+            self._map.close()
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
 
-    return string
 
+    def __exit__(self, *args):
+        self.close()
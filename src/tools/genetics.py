@@ -7,6 +7,9 @@ import bisect
 from collections import defaultdict
 from itertools   import combinations, product
 
+import numpy as np
+
+import combinatorics
 import distance
 import graphs
 
@@ -17,8 +20,169 @@ RNA_COMPLEMENT   = {'A': 'U', 'U': 'A', 'C': 'G', 'G': 'C'}
 SYMBOL_TO_NUMBER = {'A': 0, 'C': 1, 'G': 2, 'T': 3}
 NUMBER_TO_SYMBOL = {0: 'A', 1: 'C', 2: 'G', 3: 'T'}
 
+PACKED_BYTE      = {''.join(p): 64 * SYMBOL_TO_NUMBER[p[0]] + 16 * SYMBOL_TO_NUMBER[p[1]] + 4 * SYMBOL_TO_NUMBER[p[2]] + SYMBOL_TO_NUMBER[p[3]] for p in product('ACGT', repeat = 4)}
+BYTE_SYMBOLS     = [None] * 256
+BYTE_NUMBERS     = [None] * 256
+BYTE_COMPLEMENT  = [None] * 256
+
+for quad, byte in PACKED_BYTE.iteritems():
+    BYTE_SYMBOLS[byte]    = quad
+    BYTE_NUMBERS[byte]    = tuple(SYMBOL_TO_NUMBER[c] for c in quad)
+    BYTE_COMPLEMENT[byte] = PACKED_BYTE[''.join(DNA_COMPLEMENT[c] for c in quad[::-1])]
+
+BYTE_COMPLEMENT  = str(bytearray(BYTE_COMPLEMENT))
+
+DENSE_KMER_LIMIT = 4 ** 12
+
+SYMBOL_DIGITS    = ''.join(str(SYMBOL_TO_NUMBER[chr(i)]) if chr(i) in SYMBOL_TO_NUMBER else chr(i) for i in xrange(256))
+SYMBOL_BYTES     = ''.join(chr(SYMBOL_TO_NUMBER.get(chr(i), 255)) for i in xrange(256))
+
+
+
+class PackedDNA(object):
+
+    def __init__(self, string = '', data = None, start = 0, length = None):
+        if data is None:
+            padded = string + 'A' * (-len(string) % 4)
+            data   = bytearray(PACKED_BYTE[padded[i:i + 4]] for i in xrange(0, len(padded), 4))
+            length = len(string)
+
+        self._data   = data
+        self._start  = start
+        self._length = length if length is not None else 4 * len(data) - start
+
+
+    def __len__(self):
+        return self._length
+
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._length)
+            if step != 1:
+                return PackedDNA(str(self)[index])
+            return PackedDNA(data = self._data, start = self._start + start, length = max(0, stop - start))
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('PackedDNA index out of range')
+
+        position = self._start + index
+        return BYTE_SYMBOLS[self._data[position // 4]][position % 4]
+
+
+    def __iter__(self):
+        for number in self.numbers():
+            yield NUMBER_TO_SYMBOL[number]
+
+
+    def __str__(self):
+        first = self._start // 4
+        last  = (self._start + self._length + 3) // 4
+        quads = ''.join(BYTE_SYMBOLS[byte] for byte in self._data[first:last])
+        start = self._start % 4
+
+        return quads[start:start + self._length]
+
+
+    def __repr__(self):
+        return 'PackedDNA(%r)' % str(self)
+
+
+    def __eq__(self, other):
+        return len(self) == len(other) and str(self) == str(other)
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def numbers(self):
+        first = self._start // 4
+        last  = (self._start + self._length + 3) // 4
+        skip  = self._start % 4
+        left  = self._length
+
+        for byte in self._data[first:last]:
+            for number in BYTE_NUMBERS[byte][skip:skip + left]:
+                yield number
+            left -= 4 - skip
+            skip  = 0
+
+
+    def number_array(self):
+        first   = self._start // 4
+        last    = (self._start + self._length + 3) // 4
+        data    = np.frombuffer(str(self._data[first:last]), dtype = np.uint8)
+        numbers = ((data[:, None] >> np.array([6, 4, 2, 0], dtype = np.uint8)) & 3).ravel()
+        start   = self._start % 4
+
+        return numbers[start:start + self._length]
+
+
+    def reverse_complement(self):
+        first = self._start // 4
+        last  = (self._start + self._length + 3) // 4
+        data  = bytearray(str(self._data[first:last]).translate(BYTE_COMPLEMENT)[::-1])
+        start = 4 * last - self._start - self._length
+
+        return PackedDNA(data = data, start = start, length = self._length)
+
+
+    def kmer_codes(self, k):
+        return kmer_codes(self, k)
+
+
+
+def rolling_kmer_codes(numbers, k):
+    mask = (1 << 2 * k) - 1
+    code = 0
+
+    for index, number in enumerate(numbers):
+        code = ((code << 2) | number) & mask
+        if index >= k - 1:
+            yield code
+
+
+def symbol_numbers(dna):
+    if isinstance(dna, PackedDNA):
+        return dna.numbers()
+
+    return (SYMBOL_TO_NUMBER[c] for c in dna)
+
+
+def kmer_codes(dna, k):
+    return rolling_kmer_codes(symbol_numbers(dna), k)
+
+
+def canonical_kmer_codes(dna, k):
+    mask  = (1 << 2 * k) - 1
+    shift = 2 * (k - 1)
+    code  = 0
+    rc    = 0
+
+    for index, number in enumerate(symbol_numbers(dna)):
+        code = ((code << 2) | number) & mask
+        rc   = (rc >> 2) | ((3 - number) << shift)
+        if index >= k - 1:
+            yield min(code, rc)
+
+
+def reverse_complement_code(code, k):
+    complement = 0
+
+    for _ in xrange(k):
+        complement = (complement << 2) | (3 - (code & 3))
+        code     >>= 2
+
+    return complement
+
 
 def dna_complement(string):
+    if isinstance(string, PackedDNA):
+        return string.reverse_complement()
+
     dna = []
 
     for character in string:
@@ -68,6 +232,14 @@ def list_kmers(string, k, rc = False):
     length = len(string)
     kmers  = set()
 
+    if isinstance(string, PackedDNA):
+        for code in string.kmer_codes(k):
+            kmers.add(number_to_pattern(code, k))
+            if rc:
+                kmers.add(number_to_pattern(reverse_complement_code(code, k), k))
+
+        return sorted(kmers)
+
     for i in xrange(length - k + 1):
         kmer = string[i:i + k]
         kmers.add(kmer)
@@ -221,58 +393,114 @@ def kmer_occurences(string, pattern):
     return [i.start() for i in re.finditer(r'(?=(%s))' % pattern, string)]
 
 
-def kmer_composition(string, k):
-    kmers = [''.join(p) for p in product('ACGT', repeat = k)]
-    comp  = []
+def kmer_counts(dna, k, canonical = False, dense = None):
+    if dense is None:
+        dense = dense_kmer_table(len(dna), k)
 
-    for kmer in kmers:
-        comp.append(len(re.findall(r'(?=(%s))' % kmer, string)))
+    if dense:
+        return np.bincount(encode_kmers(dna, k, canonical), minlength = 4 ** k)
 
-    return comp
+    if k <= 31:
+        codes, counts = np.unique(encode_kmers(dna, k, canonical), return_counts = True)
+        return defaultdict(int, zip(codes.tolist(), counts.tolist()))
 
+    counts = defaultdict(int)
+    for code in (canonical_kmer_codes(dna, k) if canonical else kmer_codes(dna, k)):
+        counts[code] += 1
 
-def kmer_frequency_table(string, k):
-    stats = {}
+    return counts
 
-    for i in xrange(len(string) - k + 1):
-        kmer = string[i:i + k]
-        if kmer not in stats:
-            stats[kmer] = len(re.findall(r'(?=(%s))' % kmer, string))
 
-    return stats
+def kmer_composition(string, k):
+    return kmer_counts(string, k, dense = True).tolist()
+
+
+def kmer_frequency_table(string, k, canonical = False):
+    counts = kmer_counts(string, k, canonical, dense = False)
+    codes  = sorted(counts)
+
+    return dict(zip(decode_kmers(codes, k), [counts[code] for code in codes]))
 
 
 def kmer_frequency_table_mismatches(string, k, d, complements = False):
-    kmers = [''.join(p) for p in product('ACGT', repeat = k)]
     stats = defaultdict(int)
 
-    for kmer in kmers:
-        stats[kmer] = len(approximate_pattern_matching(kmer, string, d))
+    for code, count in zip(*KmerIndex(string).distinct(k)):
+        kmer = number_to_pattern(code, k)
+        for neighbour in neighbourhood(kmer, d):
+            stats[neighbour] += count
         if complements:
-            stats[kmer] += len(approximate_pattern_matching(dna_complement(kmer), string, d))
+            for neighbour in neighbourhood(dna_complement(kmer), d):
+                stats[neighbour] += count
 
     return stats
 
 
 def pattern_to_number(dna):
-    if not dna:
+    if not len(dna):
         return 0
-    return 4 * pattern_to_number(dna[:-1]) + SYMBOL_TO_NUMBER[dna[-1]]
+    return int(str(dna).translate(SYMBOL_DIGITS), 4)
 
 
 def number_to_pattern(index, k):
-    if k == 1:
-        return NUMBER_TO_SYMBOL[index]
-    return number_to_pattern(index / 4, k - 1) + NUMBER_TO_SYMBOL[index % 4]
+    quads = []
 
+    for _ in xrange((k + 3) // 4):
+        quads.append(BYTE_SYMBOLS[index & 255])
+        index >>= 8
 
-def kmer_frequency_array(dna, k):
-    freqs = [0 for _ in xrange(4 ** k)]
+    return ''.join(reversed(quads))[-k:] if k else ''
+
+
+def number_array(dna):
+    if isinstance(dna, PackedDNA):
+        return dna.number_array()
+
+    numbers = np.frombuffer(str(dna).translate(SYMBOL_BYTES), dtype = np.uint8)
+    if len(numbers) and numbers.max() > 3:
+        raise ValueError('unexpected symbol in DNA string')
+
+    return numbers
+
+
+def encode_kmers(dna, k, canonical = False):
+    numbers = number_array(dna).astype(np.int64)
+    count   = len(numbers) - k + 1
 
-    for i in xrange(len(dna) - k + 1):
-        freqs[pattern_to_number(dna[i:i + k])] += 1
+    if count <= 0:
+        return np.zeros(0, dtype = np.int64)
 
-    return freqs
+    if k > 31:
+        codes = canonical_kmer_codes(dna, k) if canonical else kmer_codes(dna, k)
+        return np.array(list(codes), dtype = object)
+
+    codes = np.zeros(count, dtype = np.int64)
+    for j in xrange(k):
+        codes = (codes << 2) | numbers[j:j + count]
+
+    if canonical:
+        rc = np.zeros(count, dtype = np.int64)
+        for j in xrange(k - 1, -1, -1):
+            rc = (rc << 2) | (3 - numbers[j:j + count])
+        codes = np.minimum(codes, rc)
+
+    return codes
+
+
+def decode_kmers(codes, k):
+    codes   = np.asarray(codes)
+    if codes.dtype == object or k > 31:
+        return [number_to_pattern(code, k) for code in codes.tolist()]
+
+    shifts  = np.arange(2 * (k - 1), -1, -2, dtype = np.int64)
+    numbers = (codes.astype(np.int64)[:, None] >> shifts) & 3
+    symbols = np.array(['A', 'C', 'G', 'T'], dtype = 'S1')[numbers]
+
+    return np.ascontiguousarray(symbols).view('S%d' % k).ravel().tolist()
+
+
+def kmer_frequency_array(dna, k):
+    return kmer_counts(dna, k, dense = True).tolist()
 
 
 def neighbourhood(pattern, d):
@@ -296,7 +524,7 @@ def neighbourhood(pattern, d):
 
 '''
     Here is the original version of the code I wrote - it ran, I 
-    thought, quite quickly (around 5 seconds) but then I found this
+    thought, quite quickly (around 5 seconds) but then I found a 
     version on stack exchange, and was really impressed. I retain 
     both for reference.
 
@@ -314,36 +542,96 @@ def neighbourhood(pattern, d):
 
         return kmers
 
+
+    def kmer_clump(dna, k, L, t):
+        positions = defaultdict(list)
+        kmers     = set()
+
+        for i in xrange(len(dna) - k + 1):
+            kmer = dna[i:i + k]
+            if kmer not in kmers:
+                while positions[kmer] and i + k - positions[kmer][0] > L:
+                    positions[kmer].pop(0)
+
+                positions[kmer].append(i)
+                if len(positions[kmer]) == t:
+                    kmers.add(kmer)
+
+        return kmers
+
+
+    The stack exchange version pops evicted positions off the front 
+    of a list, which is linear in the list length, and slices a new 
+    string for every window. The current version slides the L-window 
+    over integer k-mer codes with a counts table instead, and can scan 
+    several (k, L, t) parameter sets in the one pass.
+
 '''
 
-def kmer_clump(dna, k, L, t):
-    positions = defaultdict(list)
-    kmers     = set()
+def dense_kmer_table(length, k):
+    return 4 ** k <= min(max(length, 1024), DENSE_KMER_LIMIT)
+
+
+def kmer_clumps(dna, parameters, coordinates = False):
+    length  = len(dna)
+    codes   = {}
+    windows = []
+
+    for k, L, t in parameters:
+        if k not in codes:
+            codes[k] = encode_kmers(dna, k).tolist()
+        counts = [0] * 4 ** k if dense_kmer_table(length, k) else defaultdict(int)
+        windows.append((k, min(L, length) - k + 1, t, codes[k], counts, [], {}, []))
+
+    for j in xrange(max([len(c) for c in codes.values()] or [0])):
+        for k, W, t, kcodes, counts, found, opened, spans in windows:
+            if j < len(kcodes):
+                if j >= W:
+                    code          = kcodes[j - W]
+                    counts[code] -= 1
+                    if counts[code] == t - 1:
+                        spans.append((opened.pop(code), j - 1 + k, code))
+
+                code          = kcodes[j]
+                counts[code] += 1
+                if counts[code] == t:
+                    found.append((max(0, j - W + 1), code))
+                    opened[code] = max(0, j - W + 1)
+
+    clumps = {}
+
+    for (k, L, t), (_, W, _, kcodes, _, found, opened, spans) in zip(parameters, windows):
+        if coordinates:
+            spans.extend((start, len(kcodes) - 1 + k, code) for code, start in opened.iteritems())
+
+            regions = defaultdict(list)
+            for start, end, code in sorted(spans):
+                if regions[code] and regions[code][-1][1] >= start:
+                    regions[code][-1][1] = max(regions[code][-1][1], end)
+                else:
+                    regions[code].append([start, end])
 
-    for i in xrange(len(dna) - k + 1):
-        kmer = dna[i:i + k]
-        if kmer not in kmers:
-            while positions[kmer] and i + k - positions[kmer][0] > L:
-                positions[kmer].pop(0)
+            kmers = dict(zip(regions, decode_kmers(list(regions), k)))
+            clumps[(k, L, t)] = sorted((start, end, kmers[code]) for code in regions for start, end in regions[code])
+        else:
+            clumps[(k, L, t)] = set(decode_kmers([code for _, code in found], k))
 
-            positions[kmer].append(i)
-            if len(positions[kmer]) == t:
-                kmers.add(kmer)
+    return clumps
 
-    return kmers
+
+def kmer_clump(dna, k, L, t):
+    return kmer_clumps(dna, [(k, L, t)])[(k, L, t)]
 
 
 def shared_kmers(s1, s2, k):
     kmers  = set()
     lookup = defaultdict(list)
 
-    for i in xrange(len(s1) - k + 1):
-        kmer = s1[i:i + k]
-        lookup[kmer].append(i)
+    for i, code in enumerate(kmer_codes(s1, k)):
+        lookup[code].append(i)
 
-    for i in xrange(len(s2) - k + 1):
-        kmer = s2[i:i + k]
-        for j in lookup[kmer] + lookup[dna_complement(kmer)]:
+    for i, code in enumerate(kmer_codes(s2, k)):
+        for j in lookup.get(code, []) + lookup.get(reverse_complement_code(code, k), []):
             kmers.add((j, i))
 
     return sorted(kmers)
@@ -377,45 +665,104 @@ def skew_list(genome):
     counts = defaultdict(int)
     skew   = [0 for _ in xrange(length)]
 
-    for i in xrange(length):
-        counts[genome[i]] += 1
+    for i, base in enumerate(genome):
+        counts[base] += 1
         skew[i] = counts['G'] - counts['C']
 
     return skew
 
 
-def approximate_pattern_matching(pattern, string, d):
-    slength   = len(string)
-    plength   = len(pattern)
+class KmerIndex:
 
-    positions = []
+    def __init__(self, text):
+        self.text     = text
+        self._indexes = {}
 
-    for i in xrange(slength - plength + 1):
-        if distance.hamming(pattern, string[i:i + plength]) <= d:
-            positions.append(i)
 
-    return positions
+    def index(self, k):
+        if k not in self._indexes:
+            codes  = encode_kmers(self.text, k)
+            order  = np.argsort(codes, kind = 'mergesort')
+            self._indexes[k] = (codes[order], order)
 
+        return self._indexes[k]
 
-def implanted_motifs(strings, k, d):
-    length    = len(strings)
-    motifs    = [''.join(p) for p in product('ACGT', repeat = k)]
-    implanted = []
 
-    counter = 0
-    for motif in motifs:
-        found = []
+    def distinct(self, k):
+        codes, _ = self.index(k)
+        if not len(codes):
+            return [], []
 
-        for string in strings:
-            if approximate_pattern_matching(motif, string, d):
-                counter += 1
+        starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+        counts = np.diff(np.append(starts, len(codes)))
+
+        return codes[starts].tolist(), counts.tolist()
+
+
+    def lookup(self, k, codes):
+        index, order = self.index(k)
+        codes        = np.asarray(codes, dtype = index.dtype)
+        lefts        = np.searchsorted(index, codes, 'left')
+        rights       = np.searchsorted(index, codes, 'right')
+
+        return np.concatenate([order[l:r] for l, r in zip(lefts, rights)] or [np.zeros(0, dtype = np.intp)])
+
+
+    def occurrences(self, pattern):
+        return sorted(self.lookup(len(pattern), [pattern_to_number(pattern)]).tolist())
+
+
+    def approximate(self, pattern, d):
+        k       = len(pattern)
+        windows = len(self.text) - k + 1
+
+        if windows <= 0:
+            return []
+
+        if d >= k:
+            return range(windows)
 
-        if counter == length:
-            implanted.append(motif)
+        hood = sum(combinatorics.combinations(k, i) * 3 ** i for i in xrange(d + 1))
+        if hood <= windows:
+            codes = [pattern_to_number(kmer) for kmer in neighbourhood(pattern, d)]
+            return sorted(self.lookup(k, codes).tolist())
 
-        counter = 0
+        return self.seed_and_verify(pattern, d)
 
-    return implanted
+
+    def seed_and_verify(self, pattern, d):
+        k          = len(pattern)
+        windows    = len(self.text) - k + 1
+        size       = k // (d + 1)
+        candidates = set()
+
+        for count in xrange(d + 1):
+            offset = count * size
+            seed   = pattern[offset:offset + size] if count < d else pattern[offset:]
+            for position in self.lookup(len(seed), [pattern_to_number(seed)]).tolist():
+                start = position - offset
+                if 0 <= start < windows:
+                    candidates.add(start)
+
+        return sorted(start for start in candidates if distance.hamming_within(pattern, self.text[start:start + k], d))
+
+
+
+def approximate_pattern_matching(pattern, string, d):
+    return KmerIndex(string).approximate(pattern, d)
+
+
+def implanted_motifs(strings, k, d):
+    implanted = None
+
+    for string in strings:
+        motifs = set()
+        for code in KmerIndex(string).distinct(k)[0]:
+            motifs.update(neighbourhood(number_to_pattern(code, k), d))
+
+        implanted = motifs if implanted is None else implanted & motifs
+
+    return sorted(implanted or [])
 
 
 def check_occurences(rna):
@@ -809,16 +1156,9 @@ def convolution_frequent(counts, M):
 
 def sigma_distance(kmer, strings):
     dist = 0
-    k    = len(kmer)
 
     for string in strings:
-        hamming = []
-
-        length = len(string)
-        for i in xrange(length - k + 1):
-            hamming.append(distance.hamming(kmer, string[i:i + k]))
-
-        dist += min(hamming)
+        dist += int(distance.hamming_windows(kmer, string).min())
 
     return dist
 
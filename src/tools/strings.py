@@ -1,6 +1,15 @@
+import os
+import mmap
+import struct
+import multiprocessing
+import zlib
+
+from array       import array
 from collections import defaultdict
 from itertools   import combinations
 
+import numpy as np
+
 import arrays
 import distance
 
@@ -10,31 +19,282 @@ MISMATCH = -1
 GAP      = -1
 
 
-def basic_alignment_table(s, t):
-    m = len(s)
-    n = len(t)
 
-    T = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+def query_profile(s, t, scoring):
+    codes   = np.frombuffer(t, dtype = np.uint8)
+    profile = {}
 
-    for i in xrange(1, m + 1):
-        T[i][0] = GAP * i
+    for symbol in set(s):
+        if isinstance(scoring, tuple):
+            profile[symbol] = np.where(codes == ord(symbol), scoring[0], scoring[1]).astype(np.int64)
+        else:
+            row     = scoring[symbol]
+            missing = set(t) - set(row)
+            if missing:
+                raise KeyError(missing.pop())
 
-    for j in xrange(1, n + 1):
-        T[0][j] = GAP * j
+            values  = np.zeros(256, dtype = np.int64)
+            for key, value in row.iteritems():
+                values[ord(key)] = value
+            profile[symbol] = values[codes]
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[i][j] = max(T[i - 1][j - 1] + (MATCH if s[i - 1] == t[j - 1] else MISMATCH), T[i - 1][j] + GAP, T[i][j - 1] + GAP)
+    return profile
+
+
+def gap_boundary(length, gap, start = 0):
+    return start + gap * np.arange(length + 1, dtype = np.int64)
+
+
+def linear_gap_rows(s, t, profile, gap, top, left, floor = None):
+    steps = gap_boundary(len(t), gap)
+    row   = np.asarray(top, dtype = np.int64)
+
+    yield row
+
+    for i in xrange(1, len(s) + 1):
+        best     = np.empty(len(row), dtype = np.int64)
+        best[0]  = left[i]
+        best[1:] = np.maximum(row[:-1] + profile[s[i - 1]], row[1:] + gap)
+
+        if floor is not None:
+            np.maximum(best[1:], floor, best[1:])
+
+        row = np.maximum.accumulate(best - steps) + steps
+
+        yield row
+
+
+def linear_gap_table(s, t, profile, gap, top, left, floor = None):
+    T = np.empty((len(s) + 1, len(t) + 1), dtype = np.int32)
+
+    for i, row in enumerate(linear_gap_rows(s, t, profile, gap, top, left, floor)):
+        T[i] = row
 
     return T
 
 
-def basic_alignment(s, t):
+def affine_gap_rows(s, t, profile, sigma, epsilon, top, left, floor = None, boundary_gaps = True):
+    n      = len(t)
+    extend = max(sigma, epsilon)
+    corner = extend if boundary_gaps else sigma
+    steps  = gap_boundary(n - 1, extend) if n else np.zeros(0, dtype = np.int64)
+    middle = np.asarray(top, dtype = np.int64)
+    lower  = middle.copy() if boundary_gaps else middle + (sigma - extend)
+    upper  = middle.copy()
+
+    yield lower, middle, upper
+
+    for i in xrange(1, len(s) + 1):
+        below      = np.empty(n + 1, dtype = np.int64)
+        below[0]   = left[i]
+        below[1:]  = np.maximum(lower[1:] + epsilon, middle[1:] + sigma)
+
+        best       = np.maximum(below[1:], middle[:-1] + profile[s[i - 1]])
+        if floor is not None:
+            np.maximum(best, floor, best)
+
+        opened     = np.empty(n, dtype = np.int64)
+        opened[:1] = left[i] + corner
+        opened[1:] = best[:-1] + sigma
+
+        right      = np.empty(n + 1, dtype = np.int64)
+        right[0]   = left[i]
+        right[1:]  = np.maximum.accumulate(opened - steps) + steps
+
+        centre     = np.empty(n + 1, dtype = np.int64)
+        centre[0]  = left[i]
+        centre[1:] = np.maximum(best, right[1:])
+
+        lower, middle, upper = below, centre, right
+
+        yield lower, middle, upper
+
+
+def affine_gap_table(s, t, profile, sigma, epsilon, top, left, floor = None):
+    T = np.empty((3, len(s) + 1, len(t) + 1), dtype = np.int32)
+
+    for i, rows in enumerate(affine_gap_rows(s, t, profile, sigma, epsilon, top, left, floor)):
+        T[0][i], T[1][i], T[2][i] = rows
+
+    return T
+
+
+def transposed(scoring):
+    if isinstance(scoring, tuple):
+        return scoring
+
+    columns = set(key for row in scoring.itervalues() for key in row)
+
+    return dict((b, dict((a, scoring[a][b]) for a in scoring if b in scoring[a])) for b in columns)
+
+
+def narrowed(s, t, scoring):
+    if len(t) <= len(s):
+        return s, t, query_profile(s, t, scoring), False
+    else:
+        return t, s, query_profile(t, s, transposed(scoring)), True
+
+
+def last_row(rows):
+    row = None
+
+    for row in rows:
+        pass
+
+    return row
+
+
+def local_maximum(rows, swapped = False):
+    maximum = (0, 0, 0)
+
+    for i, row in enumerate(rows):
+        if i == 0 or len(row) == 1:
+            continue
+
+        j     = int(np.argmax(row[1:])) + 1
+        score = int(row[j])
+        end   = (j, i) if swapped else (i, j)
+
+        if score > maximum[0] or score == maximum[0] > 0 and end < maximum[1:]:
+            maximum = (score,) + end
+
+    return maximum
+
+
+def linear_gap_score(s, t, scoring, gap):
+    s, t, profile, _ = narrowed(s, t, scoring)
+
+    return int(last_row(linear_gap_rows(s, t, profile, gap, gap_boundary(len(t), gap), gap_boundary(len(s), gap)))[-1])
+
+
+BAND_FLOOR = -(1 << 30)
+
+
+class BandedRow:
+
+    def __init__(self, values, offset, width):
+        self.values = values
+        self.offset = offset
+        self.width  = width
+
+
+    def __getitem__(self, j):
+        if j < 0:
+            j += self.width
+
+        j -= self.offset
+
+        return self.values[j] if 0 <= j < len(self.values) else BAND_FLOOR
+
+
+
+class BandedTable:
+
+    def __init__(self, rows, lo, width):
+        self.rows  = rows
+        self.lo    = lo
+        self.width = width
+
+
+    def __len__(self):
+        return len(self.rows)
+
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.rows)
+
+        return BandedRow(self.rows[i], i + self.lo, self.width)
+
+
+
+def banded_table(s, t, profile, gap, top, left, lo, hi):
+    m      = len(s)
+    n      = len(t)
+
+    width  = hi - lo + 1
+    band   = np.arange(lo, hi + 1)
+    steps  = gap_boundary(width - 1, gap)
+    before = np.zeros(max(0, -lo), dtype = np.int64)
+    after  = np.zeros(max(0, m + hi - n), dtype = np.int64)
+    scores = dict((symbol, np.concatenate((before, values, after))) for symbol, values in profile.iteritems())
+
+    T      = np.empty((m + 1, width), dtype = np.int32)
+    row    = np.empty(width, dtype = np.int64)
+    inside = (band >= 0) & (band <= n)
+
+    row.fill(BAND_FLOOR)
+    row[inside] = np.asarray(top)[band[inside]]
+    T[0]        = row
+
+    for i in xrange(1, m + 1):
+        columns   = band + i
+
+        best      = row + scores[s[i - 1]][i + lo - 1 + len(before):i + hi + len(before)]
+        best[:-1] = np.maximum(best[:-1], row[1:] + gap)
+        best[columns == 0] = left[i]
+
+        row       = np.maximum.accumulate(best - steps) + steps
+        row[(columns < 0) | (columns > n)] = BAND_FLOOR
+        np.maximum(row, BAND_FLOOR, row)
+
+        T[i]      = row
+
+    return BandedTable(T, lo, n + 1)
+
+
+def band_bound(gains, m, n, gap, band, free_ends):
+    lo = min(0, n - m) - band
+    hi = max(0, n - m) + band
+
+    if free_ends:
+        return int(gains[:max(0, min(m, n - hi - 1), min(n, m + lo - 1)) + 1].max())
+
+    steps = np.arange(max(0, min(m, n, (m + n - hi + lo - 2) // 2)) + 1)
+
+    return int((gains[steps] + gap * (m + n - 2 * steps)).max())
+
+
+def widened_table(s, t, profile, gap, top, left, band, score, free_ends = False):
+    m     = len(s)
+    n     = len(t)
+
+    best  = dict((symbol, int(values.max()) if n else 0) for symbol, values in profile.iteritems())
+    gains = np.concatenate(([0], np.cumsum(sorted((best[symbol] for symbol in s), reverse = True)))).astype(np.int64)
+
+    while True:
+        T = banded_table(s, t, profile, gap, top, left, min(0, n - m) - band, max(0, n - m) + band)
+
+        if band >= max(m, n) or score(T) > band_bound(gains, m, n, gap, band, free_ends):
+            return T
+
+        band = max(2 * band, 1)
+
+
+def basic_alignment_table(s, t, band = None):
+    m       = len(s)
+    n       = len(t)
+
+    profile = query_profile(s, t, (MATCH, MISMATCH))
+
+    if band is not None:
+        return widened_table(s, t, profile, GAP, gap_boundary(n, GAP), gap_boundary(m, GAP), band, lambda T: T[m][n])
+
+    return linear_gap_table(s, t, profile, GAP, gap_boundary(n, GAP), gap_boundary(m, GAP))
+
+
+def basic_alignment(s, t, score_only = False, band = None):
+    if score_only and band is None:
+        return -linear_gap_score(s, t, (MATCH, MISMATCH), GAP)
+
     m   = len(s)
     n   = len(t)
 
-    T   = basic_alignment_table(s, t)
-    e_d = -T[m][n]
+    T   = basic_alignment_table(s, t, band)
+    e_d = -int(T[m][n])
+
+    if score_only:
+        return e_d
 
     s_a = []
     t_a = []
@@ -61,7 +321,7 @@ def count_basic_alignments(s, t):
     m = len(s)
     n = len(t)
 
-    T = basic_alignment_table(s, t)
+    T = basic_alignment_table(s, t).tolist()
     V = defaultdict(int)
 
     def alignments(m, n):
@@ -86,48 +346,65 @@ def mismatch_alignment_table(s, t):
     m = len(s)
     n = len(t)
 
-    T = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+    return linear_gap_table(s, t, query_profile(s, t, (1, -1)), -1, gap_boundary(n, -1), gap_boundary(m, -1))
 
-    for i in xrange(1, m + 1):
-        T[i][0] = -i
 
-    for j in xrange(1, n + 1):
-        T[0][j] = -j
+def semi_global_alignment_table(s, t, band = None):
+    m       = len(s)
+    n       = len(t)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[i][j] = max(T[i - 1][j - 1] + (1 if s[i - 1] == t[j - 1] else -1), T[i - 1][j] - 1, T[i][j - 1] - 1)
+    profile = query_profile(s, t, (1, -1))
 
-    return T
+    def ends(T):
+        M = (0, m, 0)
 
+        for i in xrange(m, 0, -1):
+            if M[0] < T[i][n]:
+                M = (int(T[i][n]), i, n)
 
-def semi_global_alignment_table(s, t):
-    m = len(s)
-    n = len(t)
+        for j in xrange(n, 0, -1):
+            if M[0] < T[m][j]:
+                M = (int(T[m][j]), m, j)
 
-    T = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
-    M = (0, m, 0)
+        return M
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[i][j] = max(T[i - 1][j - 1] + (1 if s[i - 1] == t[j - 1] else -1), T[i - 1][j] - 1, T[i][j - 1] - 1)
+    if band is not None:
+        T = widened_table(s, t, profile, -1, gap_boundary(n, 0), gap_boundary(m, 0), band, lambda T: ends(T)[0], True)
+    else:
+        T = linear_gap_table(s, t, profile, -1, gap_boundary(n, 0), gap_boundary(m, 0))
 
-    for i in xrange(m, 0, -1):
-        if M[0] < T[i][n]:
-            M = (T[i][n], i, n)
+    return T, ends(T)
 
-    for j in xrange(n, 0, -1):
-        if M[0] < T[m][j]:
-            M = (T[m][j], m, j)
 
-    return T, M
+def semi_global_maximum(s, t):
+    m       = len(s)
+    n       = len(t)
 
+    rows    = linear_gap_rows(s, t, query_profile(s, t, (1, -1)), -1, gap_boundary(n, 0), gap_boundary(m, 0))
+    maximum = (0, m, 0)
 
-def semi_global_alignment(s, t):
+    for i, row in enumerate(rows):
+        if i and 0 < row[n] >= maximum[0]:
+            maximum = (int(row[n]), i, n)
+
+    if n and row[1:].max() > maximum[0]:
+        j       = n - int(np.argmax(row[:0:-1]))
+        maximum = (int(row[j]), m, j)
+
+    return maximum
+
+
+def semi_global_alignment(s, t, score_only = False, band = None):
     m    = len(s)
     n    = len(t)
 
-    T, M = semi_global_alignment_table(s, t)
+    if score_only and band is None:
+        return semi_global_maximum(s, t)
+
+    T, M = semi_global_alignment_table(s, t, band)
+
+    if score_only:
+        return M
     e_d  = M[0]
 
     s_a  = []
@@ -172,32 +449,31 @@ def semi_global_alignment(s, t):
 
 
 
-def optimal_alignment_table(s, t, scoring, gap = -5):
-    m = len(s)
-    n = len(t)
-
-    T = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+def optimal_alignment_table(s, t, scoring, gap = -5, band = None):
+    m       = len(s)
+    n       = len(t)
 
-    for i in xrange(1, m + 1):
-        T[i][0] = gap * i
+    profile = query_profile(s, t, scoring)
 
-    for j in xrange(1, n + 1):
-        T[0][j] = gap * j
+    if band is not None:
+        return widened_table(s, t, profile, gap, gap_boundary(n, gap), gap_boundary(m, gap), band, lambda T: T[m][n])
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[i][j] = max(T[i - 1][j - 1] + scoring[s[i - 1]][t[j - 1]], T[i - 1][j] + gap, T[i][j - 1] + gap)
+    return linear_gap_table(s, t, profile, gap, gap_boundary(n, gap), gap_boundary(m, gap))
 
-    return T
 
 
+def optimal_alignment(s, t, scoring, gap = -5, score_only = False, band = None):
+    if score_only and band is None:
+        return linear_gap_score(s, t, scoring, gap)
 
-def optimal_alignment(s, t, scoring, gap = -5):
     m   = len(s)
     n   = len(t)
 
-    T   = optimal_alignment_table(s, t, scoring, gap)
-    e_d = T[m][n]
+    T   = optimal_alignment_table(s, t, scoring, gap, band)
+    e_d = int(T[m][n])
+
+    if score_only:
+        return e_d
 
     s_a = []
     t_a = []
@@ -234,19 +510,21 @@ def local_alignment_table(s, t, scoring, gap = -5):
     m       = len(s)
     n       = len(t)
 
-    table   = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+    table   = linear_gap_table(s, t, query_profile(s, t, scoring), gap, gap_boundary(n, 0), gap_boundary(m, 0), 0)
     maximum = (0, 0, 0)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            table[i][j] = max(table[i - 1][j - 1] + scoring[s[i - 1]][t[j - 1]], table[i - 1][j] + gap, table[i][j - 1] + gap, 0)
-            if maximum[0] < table[i][j]:
-                maximum = (table[i][j], i, j)
+    if m and n and table[1:, 1:].max() > 0:
+        i, j    = np.unravel_index(np.argmax(table[1:, 1:]), (m, n))
+        maximum = (int(table[i + 1][j + 1]), i + 1, j + 1)
 
     return table, maximum
 
 
-def local_alignment(s, t, scoring, gap = -5):
+def local_alignment(s, t, scoring, gap = -5, score_only = False):
+    if score_only:
+        a, b, profile, swapped = narrowed(s, t, scoring)
+        return local_maximum(linear_gap_rows(a, b, profile, gap, gap_boundary(len(b), 0), gap_boundary(len(a), 0), 0), swapped)
+
     T, M = local_alignment_table(s, t, scoring, gap)
 
     e_d  = M[0]
@@ -273,25 +551,51 @@ def local_alignment(s, t, scoring, gap = -5):
     return e_d, ''.join(s_a), ''.join(t_a)
 
 
-def fitting_alignment_table(s, t):
+def fitting_alignment_table(s, t, band = None):
     m       = len(s)
     n       = len(t)
 
-    table   = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+    profile = query_profile(s, t, (1, -1))
+
+    def ends(T):
+        M = (0, 0, 0)
+
+        for i in xrange(n, m + 1):
+            if n and M[0] < T[i][n]:
+                M = (int(T[i][n]), i, n)
+
+        return M
+
+    if band is not None:
+        T = widened_table(s, t, profile, -1, gap_boundary(n, 0), gap_boundary(m, 0), band, lambda T: ends(T)[0], True)
+    else:
+        T = linear_gap_table(s, t, profile, -1, gap_boundary(n, 0), gap_boundary(m, 0))
 
+    return T, ends(T)
+
+
+def fitting_maximum(s, t):
+    m       = len(s)
+    n       = len(t)
+
+    rows    = linear_gap_rows(s, t, query_profile(s, t, (1, -1)), -1, gap_boundary(n, 0), gap_boundary(m, 0))
     maximum = (0, 0, 0)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            table[i][j] = max(table[i - 1][j - 1] + (1 if s[i - 1] == t[j - 1] else -1), table[i - 1][j] - 1, table[i][j - 1] - 1)
-            if i >= n and j >= n and maximum[0] < table[i][j]:
-                maximum = (table[i][j], i, j)
+    for i, row in enumerate(rows):
+        if n and i >= n and row[n] > maximum[0]:
+            maximum = (int(row[n]), i, n)
+
+    return maximum
 
-    return table, maximum
 
+def fitting_alignment(s, t, score_only = False, band = None):
+    if score_only and band is None:
+        return fitting_maximum(s, t)
 
-def fitting_alignment(s, t):
-    T, M = fitting_alignment_table(s, t)
+    T, M = fitting_alignment_table(s, t, band)
+
+    if score_only:
+        return M
 
     e_d  = M[0]
     m, n = M[1:]
@@ -321,22 +625,35 @@ def overlap_alignment_table(s, t):
     m       = len(s)
     n       = len(t)
 
-    table   = [[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)]
+    table   = linear_gap_table(s, t, query_profile(s, t, (1, -2)), -2, gap_boundary(n, 0), gap_boundary(m, 0))
 
     maximum = (0, 0, 0)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            table[i][j] = max(table[i - 1][j - 1] + (1 if s[i - 1] == t[j - 1] else -2), table[i - 1][j] - 2, table[i][j - 1] - 2)
-
     for j in xrange(n, 0, -1):
         if maximum[0] < table[m][j]:
-            maximum = (table[m][j], m, j)
+            maximum = (int(table[m][j]), m, j)
 
     return table, maximum
 
 
-def overlap_alignment(s, t):
+def overlap_maximum(s, t):
+    m       = len(s)
+    n       = len(t)
+
+    row     = last_row(linear_gap_rows(s, t, query_profile(s, t, (1, -2)), -2, gap_boundary(n, 0), gap_boundary(m, 0)))
+    maximum = (0, 0, 0)
+
+    if n and row[1:].max() > 0:
+        j       = n - int(np.argmax(row[:0:-1]))
+        maximum = (int(row[j]), m, j)
+
+    return maximum
+
+
+def overlap_alignment(s, t, score_only = False):
+    if score_only:
+        return overlap_maximum(s, t)
+
     T, M = overlap_alignment_table(s, t)
 
     e_d  = M[0]
@@ -367,58 +684,50 @@ def constant_gap_penalty_alignment_table(s, t, scoring, gap = -5):
     m = len(s)
     n = len(t)
 
-    T = [[[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)] for _ in xrange(3)]
-
-    for i in xrange(1, m + 1):
-        T[0][i][0] = gap
-        T[1][i][0] = gap
-        T[2][i][0] = gap
-
-    for j in xrange(1, n + 1):
-        T[0][0][j] = gap
-        T[1][0][j] = gap
-        T[2][0][j] = gap
+    top  = gap_boundary(n, 0, gap)
+    left = gap_boundary(m, 0, gap)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[0][i][j] = max(T[0][i - 1][j], T[1][i - 1][j] + gap)
-            T[2][i][j] = max(T[2][i][j - 1], T[1][i][j - 1] + gap)
-            T[1][i][j] = max(T[0][i][j], T[1][i - 1][j - 1] + scoring[s[i - 1]][t[j - 1]], T[2][i][j])
+    top[0] = left[0] = 0
 
-    return T
+    return affine_gap_table(s, t, query_profile(s, t, scoring), gap, 0, top, left)
 
 
 def affine_gap_alignment_table(s, t, scoring, sigma = -11, epsilon = -1):
     m = len(s)
     n = len(t)
 
-    T = [[[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)] for _ in xrange(3)]
-    M = (0, 0, 0, 0)
-
-    for i in xrange(1, m + 1):
-        T[0][i][0] = sigma + (i - 1) * epsilon
-        T[1][i][0] = sigma + (i - 1) * epsilon
-        T[2][i][0] = sigma + (i - 1) * epsilon
+    top  = gap_boundary(n, epsilon, sigma - epsilon)
+    left = gap_boundary(m, epsilon, sigma - epsilon)
 
-    for j in xrange(1, n + 1):
-        T[0][0][j] = sigma + (j - 1) * epsilon
-        T[1][0][j] = sigma + (j - 1) * epsilon
-        T[2][0][j] = sigma + (j - 1) * epsilon
+    top[0] = left[0] = 0
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[0][i][j] = max(T[0][i - 1][j] + epsilon, T[1][i - 1][j] + sigma)
-            T[2][i][j] = max(T[2][i][j - 1] + epsilon, T[1][i][j - 1] + sigma)
-            T[1][i][j] = max(T[0][i][j], T[1][i - 1][j - 1] + scoring[s[i - 1]][t[j - 1]], T[2][i][j])
+    T = affine_gap_table(s, t, query_profile(s, t, scoring), sigma, epsilon, top, left)
+    M = (0, 0, 0, 0)
 
     for i in xrange(3):
         if M[0] < T[i][m][n]:
-            M = (T[i][m][n], i, m, n)
+            M = (int(T[i][m][n]), i, m, n)
 
     return T, M
 
 
-def affine_gap_alignment(s, t, scoring, sigma = -11, epsilon = -1):
+def affine_gap_score(s, t, scoring, sigma = -11, epsilon = -1):
+    s, t, profile, _ = narrowed(s, t, scoring)
+
+    top    = gap_boundary(len(t), epsilon, sigma - epsilon)
+    left   = gap_boundary(len(s), epsilon, sigma - epsilon)
+
+    top[0] = left[0] = 0
+
+    rows   = last_row(affine_gap_rows(s, t, profile, sigma, epsilon, top, left))
+
+    return max([0] + [int(row[-1]) for row in rows])
+
+
+def affine_gap_alignment(s, t, scoring, sigma = -11, epsilon = -1, score_only = False):
+    if score_only:
+        return affine_gap_score(s, t, scoring, sigma, epsilon)
+
     T, M    = affine_gap_alignment_table(s, t, scoring, sigma, epsilon)
 
     e_d     = M[0]
@@ -459,22 +768,22 @@ def affine_gap_local_alignment_table(s, t, scoring, sigma = -11, epsilon = -1):
     m       = len(s)
     n       = len(t)
 
-    T = [[[0 for _ in xrange(n + 1)] for _ in xrange(m + 1)] for _ in xrange(3)]
+    T = affine_gap_table(s, t, query_profile(s, t, scoring), sigma, epsilon, gap_boundary(n, 0), gap_boundary(m, 0), 0)
     M = (0, 0, 0, 0)
 
-    for i in xrange(1, m + 1):
-        for j in xrange(1, n + 1):
-            T[0][i][j] = max(T[0][i - 1][j] + epsilon, T[1][i - 1][j] + sigma)
-            T[2][i][j] = max(T[2][i][j - 1] + epsilon, T[1][i][j - 1] + sigma)
-            T[1][i][j] = max(T[0][i][j], T[1][i - 1][j - 1] + scoring[s[i - 1]][t[j - 1]], T[2][i][j], 0)
-
-            if M[0] < T[1][i][j]:
-                M = (T[1][i][j], 1, i, j)
+    if m and n and T[1][1:, 1:].max() > 0:
+        i, j = np.unravel_index(np.argmax(T[1][1:, 1:]), (m, n))
+        M    = (int(T[1][i + 1][j + 1]), 1, i + 1, j + 1)
 
     return T, M
 
 
-def affine_gap_local_alignment(s, t, scoring, sigma = -11, epsilon = -1):
+def affine_gap_local_alignment(s, t, scoring, sigma = -11, epsilon = -1, score_only = False):
+    if score_only:
+        a, b, profile, swapped = narrowed(s, t, scoring)
+        rows = affine_gap_rows(a, b, profile, sigma, epsilon, gap_boundary(len(b), 0), gap_boundary(len(a), 0), 0)
+        return local_maximum((middle for _, middle, _ in rows), swapped)
+
     T, M    = affine_gap_local_alignment_table(s, t, scoring, sigma, epsilon)
 
     e_d     = M[0]
@@ -513,32 +822,30 @@ def affine_gap_local_alignment(s, t, scoring, sigma = -11, epsilon = -1):
 
 
 def middle_column(s, t, mid, scoring, gap = -5):
-    m   = len(s)
-    n   = len(t)
+    m       = len(s)
 
-    T   = [[0] * 2 for _ in xrange(m + 1)]
-    B   = [(0, 0)] * (m + 1)
+    if mid == 0:
+        return [0] * (m + 1), [(0, 0)] * (m + 1)
 
-    for i in xrange(1, m + 1):
-        T[i][0] = gap * i
+    profile = dict((symbol, np.array([scoring[a][symbol] for a in s], dtype = np.int64)) for symbol in set(t[:mid]))
+    current = None
 
-    for j in xrange(1, mid + 1):
-        T[0][1] = gap * j
-        for i in xrange(1, m + 1):
-            T[i][1] = max(T[i - 1][0] + scoring[s[i - 1]][t[j - 1]], T[i - 1][1] + gap, T[i][0] + gap)
+    for row in linear_gap_rows(t[:mid], s, profile, gap, gap_boundary(m, gap), gap_boundary(mid, gap)):
+        previous, current = current, row
 
-            if T[i][1] == T[i - 1][0] + scoring[s[i - 1]][t[j - 1]]:
-                B[i] = (1, 1)
-            elif T[i][1] == T[i - 1][1] + gap:
-                B[i] = (1, 0)
-            elif T[i][1] == T[i][0] + gap:
-                B[i] = (0, 1)
+    return middle_column_pointers(previous, current, profile[t[mid - 1]], gap)
 
-        if j < mid:
-            for i in xrange(0, m + 1):
-                T[i][0] = T[i][1]
 
-    return [t[1] for t in T], B
+def middle_column_pointers(previous, current, scores, gap):
+    diagonal = current[1:] == previous[:-1] + scores
+    down     = current[1:] == current[:-1] + gap
+    across   = current[1:] == previous[1:] + gap
+
+    B        = [(0, 0)]
+    for d, v, h in zip(diagonal.tolist(), down.tolist(), across.tolist()):
+        B.append((1, 1) if d else (1, 0) if v else (0, 1) if h else (0, 0))
+
+    return current.tolist(), B
 
 
 def middle_node(s, t, scoring, gap = -5):
@@ -579,27 +886,140 @@ def calculate_score(s, t, scoring, gap = -5):
 
 
 def linear_space_alignment(s, t, scoring, gap = -5):
+    s_a   = []
+    t_a   = []
+    stack = [(0, len(s), 0, len(t))]
+
+    while stack:
+        top, bottom, left, right = stack.pop()
 
-    def alignment(top, bottom, left, right):
         if right - left == 0:
-            return (s[top:bottom], '-' * (bottom - top))
+            piece = (s[top:bottom], '-' * (bottom - top))
+        elif bottom - top == 0:
+            piece = ('-' * (right - left), t[left:right])
+        elif right - left == 1 or bottom - top == 1:
+            piece = optimal_alignment(s[top:bottom], t[left:right], scoring, gap)[1:]
+        else:
+            m, n  = middle_edge(s[top:bottom], t[left:right], scoring, gap)
 
-        if bottom - top == 0:
-            return ('-' * (right - left), t[left:right])
+            stack.append((n[0] + top, bottom, n[1] + left, right))
+            stack.append((m[0] + top, n[0] + top, m[1] + left, n[1] + left))
+            stack.append((top, m[0] + top, left, m[1] + left))
+            continue
 
-        if right - left == 1 or bottom - top == 1:
-            return optimal_alignment(s[top:bottom], t[left:right], scoring, gap)[1:]
+        s_a.append(piece[0])
+        t_a.append(piece[1])
 
-        m, n   = middle_edge(s[top:bottom], t[left:right], scoring, gap)
+    s, t  = ''.join(s_a), ''.join(t_a)
+    score = calculate_score(s, t, scoring, gap)
+    return score, s, t
 
-        start  = alignment(top, m[0] + top, left, m[1] + left)
-        middle = alignment(m[0] + top, n[0] + top, m[1] + left, n[1] + left)
-        end    = alignment(n[0] + top, bottom, n[1] + left, right)
 
-        return [start[i] + middle[i] + end[i] for i in xrange(2)]
+def calculate_affine_score(s, t, scoring, sigma = -11, epsilon = -1):
+    score = 0
+    last  = None
 
-    s, t  = alignment(0, len(s), 0, len(t))
-    score = calculate_score(s, t, scoring, gap)
+    for a in zip(s, t):
+        if '-' in a:
+            gap    = a.index('-')
+            score += epsilon if gap == last else sigma
+            last   = gap
+        else:
+            score += scoring[a[0]][a[1]]
+            last   = None
+
+    return score
+
+
+def gotoh_rows(s, t, profile, sigma, epsilon, start):
+    top    = gap_boundary(len(t), epsilon, sigma - epsilon)
+    left   = gap_boundary(len(s), epsilon, start)
+
+    top[0] = 0
+
+    for lower, middle, _ in affine_gap_rows(s, t, profile, sigma, epsilon, top, left, boundary_gaps = False):
+        yield middle, lower
+
+
+def affine_gap_single(c, t, scoring, sigma, epsilon, head, tail):
+    n       = len(t)
+    gaps    = gap_boundary(n - 1, epsilon, sigma - epsilon)
+    gaps[0] = 0
+
+    match   = gaps + query_profile(c, t, scoring)[c] + gaps[::-1]
+    j       = int(np.argmax(match))
+    delete  = max(head, tail) + epsilon + sigma + epsilon * (n - 1)
+
+    if match[j] >= delete:
+        return '-' * j + c + '-' * (n - j - 1), t
+    elif head >= tail:
+        return c + '-' * n, '-' + t
+    else:
+        return '-' * n + c, t + '-'
+
+
+def affine_linear_space_alignment(s, t, scoring, sigma = -11, epsilon = -1, local = False):
+    epsilon = max(sigma, epsilon)
+    opening = sigma - epsilon
+
+    if local:
+        score, m, n = affine_gap_local_alignment(s, t, scoring, sigma, epsilon, score_only = True)
+        i, j        = 0, 0
+
+        if score > 0:
+            u, v = s[:m][::-1], t[:n][::-1]
+            for i, (row, _) in enumerate(gotoh_rows(u, v, query_profile(u, v, scoring), sigma, epsilon, opening)):
+                if row.max() == score:
+                    j = int(np.argmax(row))
+                    break
+
+        s, t = s[m - i:m], t[n - j:n]
+
+    s_a   = []
+    t_a   = []
+    stack = [(0, len(s), 0, len(t), opening, opening)]
+
+    while stack:
+        item = stack.pop()
+
+        if len(item) == 2:
+            piece = item
+        else:
+            top, bottom, left, right, head, tail = item
+
+            u, v = s[top:bottom], t[left:right]
+
+            if not v:
+                piece = (u, '-' * len(u))
+            elif not u:
+                piece = ('-' * len(v), v)
+            elif len(u) == 1:
+                piece = affine_gap_single(u, v, scoring, sigma, epsilon, head, tail)
+            else:
+                mid     = (top + bottom) // 2
+                a, b    = s[top:mid], s[mid:bottom][::-1]
+
+                forward = last_row(gotoh_rows(a, v, query_profile(a, v, scoring), sigma, epsilon, head))
+                reverse = last_row(gotoh_rows(b, v[::-1], query_profile(b, v[::-1], scoring), sigma, epsilon, tail))
+
+                joined  = forward[0] + reverse[0][::-1]
+                gapped  = forward[1] + reverse[1][::-1] - opening
+                j, k    = int(np.argmax(joined)), int(np.argmax(gapped))
+
+                if joined[j] >= gapped[k]:
+                    stack.append((mid, bottom, left + j, right, opening, tail))
+                    stack.append((top, mid, left, left + j, head, opening))
+                else:
+                    stack.append((mid + 1, bottom, left + k, right, 0, tail))
+                    stack.append((s[mid - 1:mid + 1], '--'))
+                    stack.append((top, mid - 1, left, left + k, head, 0))
+                continue
+
+        s_a.append(piece[0])
+        t_a.append(piece[1])
+
+    s, t  = ''.join(s_a), ''.join(t_a)
+    score = calculate_affine_score(s, t, scoring, sigma, epsilon)
     return score, s, t
 
 
@@ -1179,36 +1599,48 @@ def shortest_superstring(strings):
         return ''
 
 
-    The current version makes use of binary search to reduce the problem 
+    the next version makes use of binary search to reduce the problem 
     space - O(log(N) * N * K)
 
-'''
+    def longest_common_substring(strings):
+        strings = sorted(strings, key = len)
 
-def longest_common_substring(strings):
-    strings = sorted(strings, key = len)
+        string  = strings[0]
+        length  = len(string)
+        strings = strings[1:]
 
-    string  = strings[0]
-    length  = len(string)
-    strings = strings[1:]
+        def common_substring(l):
+            for i in xrange(length - l + 1):
+                cs = string[i:i + l + 1]
+                if all(cs in s for s in strings):
+                    return cs
+            return ''
 
-    def common_substring(l):
-        for i in xrange(length - l + 1):
-            cs = string[i:i + l + 1]
-            if all(cs in s for s in strings):
-                return cs
-        return ''
+        low     = 0
+        high    = length
 
-    low     = 0
-    high    = length
+        while low + 1 < high:
+            mid = low + (high - low) // 2
+            if common_substring(mid):
+                low  = mid
+            else:
+                high = mid
 
-    while low + 1 < high:
-        mid = low + (high - low) // 2
-        if common_substring(mid):
-            low  = mid
-        else:
-            high = mid
+        return common_substring(low)
 
-    return common_substring(low)
+
+    The current version slides a window over a generalized suffix array 
+    until it covers every string, reading the shared prefix length from 
+    the LCP array - O(N * K) after the suffix array is built. Ties go to 
+    the substring found first in the shortest string.
+
+'''
+
+def longest_common_substring(strings):
+    strings = sorted(strings, key = len)
+    shared  = arrays.GeneralizedSuffixArray(strings).longest_shared(len(strings))
+
+    return min(shared, key = strings[0].find) if shared else ''
 
 
 def interwoven_sequences(string1, string2):
@@ -1303,25 +1735,43 @@ def shortest_non_shared_substring(s1, s2):
 
 
 
-def burrows_wheeler_transform(text):
-    matrix = []
+def burrows_wheeler_chunks(text, sa = None, size = 1 << 20):
+    if sa is None:
+        if text[-1] == '$':
+            sa = arrays.integer_suffix_array(text)
+        else:
+            n  = len(text)
+            sa = [i for i in arrays.integer_suffix_array(text + text) if i < n]
 
-    for i in xrange(len(text)):
-        matrix.append(text[-i:] + text[:-i])
+    symbols = np.frombuffer(text, dtype = np.uint8)
+    rows    = np.asarray(sa, dtype = np.intp)
 
-    return ''.join(row[-1] for row in sorted(matrix))
+    for start in xrange(0, len(rows), size):
+        yield symbols[rows[start:start + size] - 1].tostring()
 
 
-def inverse_burrows_wheeler_transform(text):
-    first = arrays.indexed_text_array(sorted(text))
-    last  = arrays.indexed_text_array(text)
+def burrows_wheeler_transform(text, sa = None):
+    return ''.join(burrows_wheeler_chunks(text, sa))
+
+
+def last_to_first_array(bwt):
+    rows = np.argsort(np.frombuffer(bwt, dtype = np.uint8), kind = 'mergesort')
+    ltof = np.empty(len(bwt), dtype = np.intp)
+    ltof[rows] = np.arange(len(bwt))
+
+    return ltof.tolist()
 
-    row   = [first[0]]
 
-    while len(row) < len(first):
-        row.append(first[last.index(row[-1])])
+def inverse_burrows_wheeler_transform(text):
+    ltof    = last_to_first_array(text)
+    symbols = []
+    row     = 0
+
+    for _ in xrange(len(text) - 1):
+        symbols.append(text[row])
+        row = ltof[row]
 
-    return ''.join(r[0] for r in row[1:] + row[:1])
+    return ''.join(reversed(symbols)) + min(text)
 
 
 
@@ -1435,8 +1885,358 @@ def multiple_approximate_pattern_matching(d, pattern, text, bwt, cm, fo, psa, if
         return starts
 
     for start in starts():
-        if distance.hamming(text[start:start + length], pattern) <= d:
+        if distance.hamming_within(text[start:start + length], pattern, d):
             locations.append(start)
 
     return locations
 
+
+
+
+class FMIndex:
+
+    def __init__(self, bwt, sa = None, text = None, occ_step = 32, sa_step = 32, first = None, checkpoints = None, samples = None):
+        self.bwt         = bwt
+        self.text        = text
+        self.occ_step    = occ_step
+        self.sa_step     = sa_step
+        self.first       = first if first is not None else {}
+        self.checkpoints = checkpoints if checkpoints is not None else {}
+        self.samples     = samples if samples is not None else {}
+
+        if first is None:
+            total = 0
+            for symbol in sorted(set(bwt)):
+                self.first[symbol]       = total
+                self.checkpoints[symbol] = array('l', [0])
+                total                   += bwt.count(symbol)
+
+            for start in xrange(0, len(bwt), occ_step):
+                for symbol, checkpoint in self.checkpoints.iteritems():
+                    checkpoint.append(checkpoint[-1] + bwt.count(symbol, start, start + occ_step))
+
+        if sa is not None and samples is None:
+            for row, position in enumerate(sa):
+                if position % sa_step == 0:
+                    self.samples[row] = position
+
+
+    def __len__(self):
+        return len(self.bwt)
+
+
+    def rank(self, symbol, i):
+        block = i // self.occ_step
+
+        return int(self.checkpoints[symbol][block]) + self.bwt.count(symbol, block * self.occ_step, i)
+
+
+    def last_to_first(self, row):
+        symbol = self.bwt[row]
+
+        return self.first[symbol] + self.rank(symbol, row)
+
+
+    def interval(self, pattern, top = 0, bottom = None):
+        if bottom is None:
+            bottom = len(self.bwt)
+
+        for symbol in reversed(pattern):
+            if symbol not in self.first:
+                return 0, 0
+
+            top    = self.first[symbol] + self.rank(symbol, top)
+            bottom = self.first[symbol] + self.rank(symbol, bottom)
+
+            if top >= bottom:
+                return 0, 0
+
+        return top, bottom
+
+
+    def count(self, pattern):
+        top, bottom = self.interval(pattern)
+
+        return bottom - top
+
+
+    def position(self, row):
+        steps    = 0
+        position = self.samples.get(row)
+
+        while position is None:
+            row      = self.last_to_first(row)
+            steps   += 1
+            position = self.samples.get(row)
+
+        return position + steps
+
+
+    def locate(self, pattern):
+        top, bottom = self.interval(pattern)
+
+        return sorted(self.position(row) for row in xrange(top, bottom))
+
+
+    def intervals(self, patterns):
+        found = {}
+        path  = []
+
+        for pattern in sorted(set(patterns), key = lambda pattern: pattern[::-1]):
+            suffix = pattern[::-1]
+            shared = 0
+            limit  = min(len(path), len(suffix))
+
+            while shared < limit and path[shared][0] == suffix[shared]:
+                shared += 1
+
+            del path[shared:]
+
+            top, bottom = path[-1][1:] if path else (0, len(self.bwt))
+
+            for symbol in suffix[shared:]:
+                if top < bottom and symbol in self.first:
+                    top    = self.first[symbol] + self.rank(symbol, top)
+                    bottom = self.first[symbol] + self.rank(symbol, bottom)
+                else:
+                    top, bottom = 0, 0
+                path.append((symbol, top, bottom))
+
+            found[pattern] = (top, bottom) if top < bottom else (0, 0)
+
+        return found
+
+
+    def locate_many(self, patterns):
+        found = {}
+
+        for pattern, (top, bottom) in self.intervals(patterns).iteritems():
+            found[pattern] = sorted(self.position(row) for row in xrange(top, bottom))
+
+        return [found[pattern] for pattern in patterns]
+
+
+    def approximate(self, pattern, d):
+        return self.approximate_many([pattern], d)[0]
+
+
+    def approximate_many(self, patterns, d):
+        seeds = {}
+
+        for pattern in patterns:
+            offset = len(pattern) // (d + 1)
+            for count in xrange(d + 1):
+                index = count * offset
+                seeds[pattern, count] = pattern[index:index + offset] if count < d else pattern[index:]
+
+        located = dict(zip(seeds.values(), self.locate_many(seeds.values())))
+        found   = {}
+
+        for pattern in set(patterns):
+            length = len(pattern)
+            offset = length // (d + 1)
+            last   = len(self.text) - length - 1
+            starts = set()
+
+            for count in xrange(d + 1):
+                starts.update(match - count * offset for match in located[seeds[pattern, count]])
+
+            found[pattern] = sorted(start for start in starts if 0 <= start <= last and distance.hamming_within(self.text[start:start + length], pattern, d))
+
+        return [found[pattern] for pattern in patterns]
+
+
+
+def fm_index(text, occ_step = 32, sa_step = 32):
+    if text[-1] != '$':
+        text += '$'
+
+    sa  = arrays.integer_suffix_array(text)
+    bwt = burrows_wheeler_transform(text, sa)
+
+    return FMIndex(bwt, sa, text, occ_step, sa_step)
+
+
+
+
+FM_INDEX_MAGIC   = 'RFMINDEX'
+FM_INDEX_VERSION = 1
+FM_INDEX_HEADER  = struct.Struct('<8sIQIIIQI')
+
+
+
+class MappedText:
+
+    def __init__(self, buffer, offset, length):
+        self._buffer = buffer
+        self._offset = offset
+        self._length = length
+
+
+    def __len__(self):
+        return self._length
+
+
+    def __getitem__(self, index):
+        return self._buffer[self._offset + index]
+
+
+    def __str__(self):
+        return self._buffer[self._offset:self._offset + self._length]
+
+
+    def count(self, symbol, start = 0, end = None):
+        end = self._length if end is None else min(end, self._length)
+
+        return self._buffer[self._offset + start:self._offset + end].count(symbol)
+
+
+
+class MappedSamples:
+
+    def __init__(self, rows, positions):
+        self._rows      = rows
+        self._positions = positions
+
+
+    def __len__(self):
+        return len(self._rows)
+
+
+    def __iter__(self):
+        return iter(self._rows.tolist())
+
+
+    def __getitem__(self, row):
+        return self.get(row)
+
+
+    def get(self, row, default = None):
+        index = np.searchsorted(self._rows, row)
+
+        if index < len(self._rows) and self._rows[index] == row:
+            return int(self._positions[index])
+
+        return default
+
+
+
+def aligned(offset):
+    return offset + (-offset % 8)
+
+
+def write_fm_index(file_path, index, checksum = 0):
+    symbols = sorted(index.first)
+    rows    = sorted(index.samples)
+    length  = len(index.bwt)
+
+    with open(file_path, 'wb') as file:
+        file.write(FM_INDEX_HEADER.pack(FM_INDEX_MAGIC, FM_INDEX_VERSION, length, index.occ_step, index.sa_step, len(symbols), len(rows), checksum))
+        file.write(''.join(symbols))
+        file.write('\0' * (aligned(file.tell()) - file.tell()))
+        file.write(np.array([index.first[symbol] for symbol in symbols], dtype = '<i8').tostring())
+        file.write(str(index.bwt))
+        file.write('\0' * (aligned(file.tell()) - file.tell()))
+
+        for symbol in symbols:
+            file.write(np.asarray(index.checkpoints[symbol], dtype = '<i8').tostring())
+
+        file.write(np.array(rows, dtype = '<i8').tostring())
+        file.write(np.array([index.samples[row] for row in rows], dtype = '<i8').tostring())
+
+
+def read_fm_index(file_path, text = None):
+    with open(file_path, 'rb') as file:
+        buffer = mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ)
+
+    magic, version, length, occ_step, sa_step, count, samples, checksum = FM_INDEX_HEADER.unpack_from(buffer, 0)
+
+    if magic != FM_INDEX_MAGIC or version != FM_INDEX_VERSION:
+        raise ValueError('%s is not a version %s FM-index file' % (file_path, FM_INDEX_VERSION))
+
+    offset  = FM_INDEX_HEADER.size
+    symbols = buffer[offset:offset + count]
+    offset  = aligned(offset + count)
+    first   = np.frombuffer(buffer, dtype = '<i8', count = count, offset = offset).tolist()
+    offset += 8 * count
+
+    bwt     = MappedText(buffer, offset, length)
+    offset  = aligned(offset + length)
+
+    blocks      = len(xrange(0, length, occ_step)) + 1
+    checkpoints = {}
+    for symbol in symbols:
+        checkpoints[symbol] = np.frombuffer(buffer, dtype = '<i8', count = blocks, offset = offset)
+        offset += 8 * blocks
+
+    rows      = np.frombuffer(buffer, dtype = '<i8', count = samples, offset = offset)
+    positions = np.frombuffer(buffer, dtype = '<i8', count = samples, offset = offset + 8 * samples)
+
+    return FMIndex(bwt, text = text, occ_step = occ_step, sa_step = sa_step, first = dict(zip(symbols, first)), checkpoints = checkpoints, samples = MappedSamples(rows, positions))
+
+
+def cached_fm_index(text, file_path, occ_step = 32, sa_step = 32):
+    if text[-1] != '$':
+        text += '$'
+
+    checksum = zlib.crc32(text) & 0xffffffff
+
+    if os.path.exists(file_path):
+        with open(file_path, 'rb') as file:
+            header = file.read(FM_INDEX_HEADER.size)
+
+        if len(header) == FM_INDEX_HEADER.size:
+            magic, version, length, _, _, _, _, stored = FM_INDEX_HEADER.unpack(header)
+            if magic == FM_INDEX_MAGIC and version == FM_INDEX_VERSION and length == len(text) and stored == checksum:
+                return read_fm_index(file_path, text)
+
+    index = fm_index(text, occ_step, sa_step)
+    write_fm_index(file_path, index, checksum)
+
+    return index
+
+
+
+POOLED_FM_INDEX = None
+
+
+def open_pooled_fm_index(file_path, text = None):
+    global POOLED_FM_INDEX
+
+    POOLED_FM_INDEX = read_fm_index(file_path, text)
+
+
+def pooled_matches(arguments):
+    patterns, d = arguments
+
+    if d:
+        return POOLED_FM_INDEX.approximate_many(patterns, d)
+
+    return POOLED_FM_INDEX.locate_many(patterns)
+
+
+def batch_matches(file_path, patterns, d = 0, text = None, processes = None):
+    if d and text is None:
+        raise ValueError('approximate matching needs the indexed text')
+
+    unique = sorted(set(patterns), key = lambda pattern: pattern[::-1])
+
+    if processes is None or processes < 2 or len(unique) < 2:
+        index   = read_fm_index(file_path, text)
+        chunks  = [unique]
+        results = [index.approximate_many(unique, d) if d else index.locate_many(unique)]
+    else:
+        size    = -(-len(unique) // (4 * processes))
+        chunks  = [unique[start:start + size] for start in xrange(0, len(unique), size)]
+        pool    = multiprocessing.Pool(processes, open_pooled_fm_index, (file_path, text))
+        try:
+            results = pool.map(pooled_matches, [(chunk, d) for chunk in chunks])
+        finally:
+            pool.close()
+            pool.join()
+
+    found = {}
+    for chunk, result in zip(chunks, results):
+        found.update(zip(chunk, result))
+
+    return [found[pattern] for pattern in patterns]
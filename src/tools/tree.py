@@ -1,5 +1,10 @@
+from array       import array
 from collections import deque
 
+import numpy as np
+
+import arrays
+
 
 class Node:
 
@@ -11,7 +16,12 @@ class Node:
 
 
     def get_root(self):
-        return self if self.is_root() else self.parent.get_root()
+        node = self
+
+        while not node.is_root():
+            node = node.parent
+
+        return node
 
 
     def get_children(self):
@@ -38,11 +48,27 @@ class Node:
 
 
     def descendent_count(self):
-        return 1 if self.is_leaf() else sum(child.descendent_count() for child in self.children)
+        count = 0
+        stack = [self]
+
+        while stack:
+            node = stack.pop()
+            if node.is_leaf():
+                count += 1
+            stack.extend(node.get_children())
+
+        return count
 
 
     def depth(self):
-        return 1 + self.parent.depth() if self.parent else 0
+        depth = 0
+        node  = self
+
+        while node.parent:
+            depth += 1
+            node   = node.parent
+
+        return depth
 
 
     def add_child(self, node):
@@ -123,31 +149,81 @@ class BaseSuffixTree:
 
     def traverse(self):
         traversal = []
+        stack     = [self.root]
 
-        def traverse_from(node):
+        while stack:
+            node = stack.pop()
             if node.label:
                 traversal.append(node.label)
-
-            for child in node.children:
-                traverse_from(child)
-
-        traverse_from(self.root)
+            stack.extend(reversed(node.children))
 
         return traversal
 
 
     def __str__(self):
         string = []
+        stack  = [(self.root, '  ')]
 
-        def traverse_for_printing(node, space):
+        while stack:
+            node, space = stack.pop()
             string.append(space + str(node))
+            stack.extend((child, space + '  ') for child in reversed(node.children))
+
+        return '\n'.join(string)
 
-            for child in node.children:
-                traverse_for_printing(child, space + '  ')
 
-        traverse_for_printing(self.root, '  ')
 
-        return '\n'.join(string)
+
+class SuffixTreeNode(Node):
+
+    def __init__(self, tree, index):
+        self.tree  = tree
+        self.index = index
+        self.data  = None
+
+
+    label    = property(lambda self: self.tree.label(self.index))
+    parent   = property(lambda self: self.tree.node(self.tree.parent[self.index]) if self.index else None)
+    children = property(lambda self: [self.tree.node(child) for child in self.tree.children(self.index)])
+
+
+    def is_leaf(self):
+        return self.tree.child[self.index] < 0
+
+
+    def child_count(self):
+        return len(self.tree.children(self.index))
+
+
+    def descendent_count(self):
+        return self.tree.leaves[self.index]
+
+
+    def depth(self):
+        depth = 0
+        index = self.index
+
+        while index:
+            depth += 1
+            index  = self.tree.parent[index]
+
+        return depth
+
+
+    def path(self):
+        return self.tree.path(self.index)
+
+
+    def __eq__(self, other):
+        return isinstance(other, SuffixTreeNode) and other.tree is self.tree and other.index == self.index
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def __hash__(self):
+        return hash((id(self.tree), self.index))
 
 
 
@@ -158,51 +234,265 @@ class SuffixTree(BaseSuffixTree):
         if string[-1] != '$':
             string += '$'
 
-        self.root = Node('')
-        for i in xrange(len(string)):
-            self.add_child(self.root, Node(string[i:]))
+        self.string = string
+
+        n       = len(string)
+        start   = array('i', [0])
+        end     = array('i', [0])
+        link    = array('i', [0])
+        edges   = {}
+        node    = 0
+        edge    = 0
+        length  = 0
+        pending = 0
+
+        for i in xrange(n):
+            symbol   = string[i]
+            last     = -1
+            pending += 1
+
+            while pending:
+                if length == 0:
+                    edge = i
+
+                key   = node << 8 | ord(string[edge])
+                child = edges.get(key)
+
+                if child is None:
+                    edges[key] = len(start)
+                    start.append(i)
+                    end.append(n)
+                    link.append(0)
+                    if last >= 0:
+                        link[last] = node
+                        last       = -1
+                else:
+                    span = end[child] - start[child]
+                    if length >= span:
+                        edge   += span
+                        length -= span
+                        node    = child
+                        continue
+
+                    if string[start[child] + length] == symbol:
+                        if last >= 0 and node:
+                            link[last] = node
+                        length += 1
+                        break
+
+                    split      = len(start)
+                    edges[key] = split
+                    start.append(start[child])
+                    end.append(start[child] + length)
+                    link.append(0)
+
+                    edges[split << 8 | ord(symbol)] = len(start)
+                    start.append(i)
+                    end.append(n)
+                    link.append(0)
 
+                    start[child] += length
+                    edges[split << 8 | ord(string[start[child]])] = child
 
-    def repeats(self, length = 1):
-        repeats = []
+                    if last >= 0:
+                        link[last] = split
+                    last = split
+
+                pending -= 1
+
+                if node == 0 and length > 0:
+                    length -= 1
+                    edge    = i - pending + 1
+                elif node:
+                    node    = link[node]
+
+        del link
 
-        def to_string(node):
-            string = ''
+        m      = len(start)
+        keys   = np.fromiter(edges.iterkeys(), dtype = np.int64, count = len(edges))
+        nodes  = np.fromiter(edges.itervalues(), dtype = np.int64, count = len(edges))
+        del edges
 
-            while node:
-                string = node.label + string
-                node   = node.parent
+        parent = np.full(m, -1, dtype = np.int64)
+        parent[nodes] = keys >> 8
+        del keys, nodes
 
-            return string
+        first  = np.frombuffer(start, dtype = np.intc).astype(np.int64)
+        length = np.frombuffer(end, dtype = np.intc).astype(np.int64) - first
+        del end
 
-        def traverse_from(node):
-            if node.label and node.child_count() > 1:
-                string = to_string(node)
-                if len(string) >= length:
-                    repeats.append(string)
+        self.finish(parent, first, length)
 
-            for child in node.children:
-                traverse_from(child)
 
-        traverse_from(self.root)
+    def finish(self, parent, start, length):
+        m      = len(parent)
+        counts = np.bincount(parent[1:], minlength = m)
+        kids   = np.argsort(parent[1:], kind = 'mergesort') + 1
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        depth  = np.zeros(m, dtype = np.int64)
+        levels = []
+        nodes  = np.array([0])
 
-        return repeats
+        while len(nodes):
+            levels.append(nodes)
+            sizes = counts[nodes]
+            total = int(sizes.sum())
+            nodes = kids[np.repeat(bounds[nodes] - np.cumsum(sizes) + sizes, sizes) + np.arange(total)]
+            depth[nodes] = depth[parent[nodes]] + length[nodes]
+
+        leaf   = counts == 0
+        first  = np.where(leaf, len(self.string) - depth, len(self.string))
+        leaves = leaf.astype(np.int64)
+
+        for nodes in reversed(levels[1:]):
+            np.minimum.at(first, parent[nodes], first[nodes])
+            np.add.at(leaves, parent[nodes], leaves[nodes])
+
+        order   = np.lexsort((first[1:], parent[1:])) + 1
+        same    = parent[order[1:]] == parent[order[:-1]]
+        child   = np.full(m, -1, dtype = np.int64)
+        sibling = np.full(m, -1, dtype = np.int64)
+
+        heads   = np.concatenate(([True], ~same))
+        child[parent[order[heads]]] = order[heads]
+        sibling[order[:-1][same]]   = order[1:][same]
+
+        self.parent  = arrays.int_array(parent)
+        self.child   = arrays.int_array(child)
+        self.sibling = arrays.int_array(sibling)
+        self.start   = arrays.int_array(start)
+        self.length  = arrays.int_array(length)
+        self.depth   = arrays.int_array(depth)
+        self.leaves  = arrays.int_array(leaves)
+
+
+    root = property(lambda self: self.node(0))
+
+
+    def node(self, index):
+        return SuffixTreeNode(self, index)
+
+
+    def children(self, index):
+        children = []
+        child    = self.child[index]
+
+        while child >= 0:
+            children.append(child)
+            child = self.sibling[child]
+
+        return children
+
+
+    def label(self, index):
+        return self.string[self.start[index]:self.start[index] + self.length[index]]
+
+
+    def path(self, index):
+        end = self.start[index] + self.length[index]
+
+        return self.string[end - self.depth[index]:end]
+
+
+    def preorder(self):
+        index = 0
+
+        while True:
+            yield index
+
+            if self.child[index] >= 0:
+                index = self.child[index]
+                continue
+
+            while index and self.sibling[index] < 0:
+                index = self.parent[index]
+
+            if not index:
+                return
+
+            index = self.sibling[index]
+
+
+    def internal(self):
+        return (index for index in self.preorder() if index and self.child[index] >= 0 and self.sibling[self.child[index]] >= 0)
+
+
+    def traverse(self):
+        return [self.label(index) for index in self.preorder() if self.length[index]]
+
+
+    def repeats(self, length = 1):
+        return [self.path(index) for index in self.internal() if self.depth[index] >= length]
 
 
     def longest_repeat(self):
-        return max(self.repeats(), key = len)
+        return self.path(max(self.internal(), key = lambda index: self.depth[index]))
+
+
+    def longest_repeats(self, count):
+        nodes   = [index for index in self.preorder() if index and self.leaves[index] >= count]
+        longest = max(self.depth[index] for index in nodes)
+
+        return sorted(self.path(index) for index in nodes if self.depth[index] == longest)
+
 
+    def __str__(self):
+        string = []
+        stack  = [(0, 0)]
+
+        while stack:
+            index, level = stack.pop()
+            string.append('  ' * (level + 1) + '%s - depth:%s' % (self.label(index), level))
+            stack.extend((child, level + 1) for child in reversed(self.children(index)))
+
+        return '\n'.join(string)
 
 
 
 class GeneralizedSuffixTree(BaseSuffixTree):
 
     def __init__(self, strings):
-        self.root = Node('')
-        for index, string in enumerate(strings):
-            string += '$%s' % index + 1
-            for i in xrange(len(string)):
-                self.add_child(self.root, Node(string[i:]))
+        self.index = arrays.GeneralizedSuffixArray(strings)
+        self.root  = Node('')
+        self.root.data = set()
+
+        text  = self.index.text
+        stack = [(self.root, 0)]
+
+        for row in xrange(len(self.index)):
+            shared = self.index.lcp[row]
+            last   = None
+
+            while stack[-1][1] > shared:
+                last, _ = stack.pop()
+                stack[-1][0].data |= last.data
+
+            parent, depth = stack[-1]
+
+            if depth < shared:
+                middle       = Node(last.label[:shared - depth], parent)
+                middle.data  = set(last.data)
+                last.label   = last.label[shared - depth:]
+                last.parent  = middle
+                middle.children.append(last)
+                parent.children[-1] = middle
+                stack.append((middle, shared))
+                parent = middle
+
+            start     = self.index.sa[row]
+            length    = self.index.lengths[row]
+            leaf      = Node(text[start + shared:start + length + 1])
+            leaf.data = set([self.index.colors[row]])
+            parent.add_child(leaf)
+            stack.append((leaf, length + 1))
+
+        while len(stack) > 1:
+            last, _ = stack.pop()
+            stack[-1][0].data |= last.data
+
+
+    def longest_shared(self, k):
+        return self.index.longest_shared(k)
 
 
 
@@ -1,72 +1,185 @@
+from array       import array
 
 
 class Trie:
 
-    def __init__(self):
-        self._root  = {'': {}}
+    def __init__(self, alphabet = ''):
+        self._columns   = {}
+        self._symbols   = []
+        self._width     = max(len(alphabet), 1)
+        self._next      = array('i', [0]) * self._width
+        self._degree    = array('i', [0])
+        self._terminal  = {}
+        self._automaton = None
+
+        for symbol in alphabet:
+            self._column(symbol)
+
+
+    def _column(self, symbol):
+        column = self._columns.get(symbol)
+
+        if column is None:
+            column = len(self._symbols)
+            if column == self._width:
+                self._widen()
+            self._columns[symbol] = column
+            self._symbols.append(symbol)
+
+        return column
+
+
+    def _widen(self):
+        width = 2 * self._width
+        table = array('i', [0]) * (width * len(self._degree))
+
+        for node in xrange(len(self._degree)):
+            table[node * width:node * width + self._width] = self._next[node * self._width:(node + 1) * self._width]
+
+        self._next  = table
+        self._width = width
+
+
+    def _child(self, node, symbol):
+        column = self._columns.get(symbol)
+
+        return self._next[node * self._width + column] if column is not None else 0
+
+
+    def _children(self, node):
+        row      = self._next[node * self._width:(node + 1) * self._width]
+        children = sorted((child, self._symbols[column]) for column, child in enumerate(row) if child)
+
+        return dict_order([(symbol, child) for child, symbol in children])
 
 
     def prefix_matching(self, text):
-        current = self._root['']
+        current = 0
         index   = 0
-        symbol  = text[index]
 
         while True:
-            if not current:
+            if not self._degree[current]:
                 return text[:index]
-            elif symbol in current:
-                current = current[symbol]
+            elif index < len(text) and self._child(current, text[index]):
+                current = self._child(current, text[index])
                 index  += 1
-                if index < len(text):
-                    symbol = text[index]
             else:
                 return None
 
 
     def matching(self, text):
-        matches = []
-        index   = 0
+        leaves = self.compile()[2]
+
+        return sorted(match for match in self.scan(text) if match[1] in leaves)
+
+
+    def compile(self):
+        if self._automaton is not None:
+            return self._automaton
+
+        width = self._width
+        table = self._next
+        words = self._terminal
+        fail  = array('i', [0]) * len(self._degree)
+        links = array('i', [0]) * len(self._degree)
+        queue = array('i', (child for child in table[:width] if child))
+        head  = 0
+
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for column, target in enumerate(table[state * width:(state + 1) * width]):
+                if target:
+                    queue.append(target)
 
-        while index < len(text):
-            match = self.prefix_matching(text[index:])
-            if match:
-                matches.append((index, match))
-            index += 1
+                    back = fail[state]
+                    while back and not table[back * width + column]:
+                        back = fail[back]
 
-        return matches
+                    fail[target]  = table[back * width + column] if state else 0
+                    links[target] = fail[target] if fail[target] in words else links[fail[target]]
+
+        leaves = set(word for node, word in words.iteritems() if node and not self._degree[node])
+
+        self._automaton = (fail, links, leaves)
+
+        return self._automaton
+
+
+    def scan(self, text):
+        fail, links, _ = self.compile()
+
+        width  = self._width
+        table  = self._next
+        words  = self._terminal
+        chunks = [text] if isinstance(text, str) else text
+        state  = 0
+        offset = 0
+
+        for chunk in chunks:
+            for index, symbol in enumerate(chunk):
+                column = self._columns.get(symbol)
+
+                if column is None:
+                    state = 0
+                    continue
+
+                while state and not table[state * width + column]:
+                    state = fail[state]
+                state = table[state * width + column]
+
+                match = state if state in words else links[state]
+                while match:
+                    word  = words[match]
+                    yield offset + index - len(word) + 1, word
+                    match = links[match]
+
+            offset += len(chunk)
 
 
     def insert(self, string):
-        node  = self._root['']
-        index = 0
-        n     = len(string)
-
-        while index < n:
-            if string[index] in node:
-                node   = node[string[index]]
-                index += 1
-            else:
-                break
+        self._automaton = None
+
+        node = 0
+
+        for symbol in string:
+            child = self._child(node, symbol)
+
+            if not child:
+                column = self._column(symbol)
+                child  = len(self._degree)
+
+                self._next.extend(array('i', [0]) * self._width)
+                self._degree.append(0)
+                self._next[node * self._width + column] = child
+                self._degree[node] += 1
 
-        while index < n:
-            node[string[index]] = {}
-            node   = node[string[index]]
-            index += 1
+            node = child
+
+        self._terminal[node] = string
+
+
+    def insert_many(self, strings):
+        for string in strings:
+            self.insert(string)
 
 
     def edges(self, label = 0):
         labeled = []
+        current = label + 1
+        stack   = [(label, child, symbol) for symbol, child in reversed(self._children(0))]
 
-        def edges_traversal(current, label):
-            current_label = label + 1
+        while stack:
+            parent, node, symbol = stack.pop()
+            labeled.append((parent, current, symbol))
+            stack.extend((current, child, key) for key, child in reversed(self._children(node)))
+            current += 1
 
-            for key in current:
-                labeled.append((label, current_label, key))
-                current_label = edges_traversal(current[key], current_label)
+        return labeled
 
-            return current_label
 
-        edges_traversal(self._root[''], label)
 
-        return labeled
+def dict_order(items):
+    order = dict((key, index) for index, (key, _) in enumerate(items))
 
+    return [items[order[key]] for key in order]
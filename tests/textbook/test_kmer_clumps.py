@@ -0,0 +1,30 @@
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '../../src/tools'))
+
+import unittest
+
+import genetics
+
+
+class TestKmerClumps(unittest.TestCase):
+
+    def test_kmer_clump(self):
+        dna = 'CGGACTCGACAGATGTGAAGAACGACAATGTGAAGACTCGACACGACAGAGTGAAGAGAAGAGGAAACATTGTAA'
+
+        self.assertEqual(genetics.kmer_clump(dna, 5, 50, 4), set(['CGACA', 'GAAGA']))
+
+
+    def test_sustained_clump_coordinates(self):
+        self.assertEqual(genetics.kmer_clumps('AAAAAAA', [(1, 3, 2)], coordinates = True), {(1, 3, 2): [(0, 7, 'A')]})
+        self.assertEqual(genetics.kmer_clumps('ACGTTTACGT', [(2, 5, 2)], coordinates = True), {(2, 5, 2): [(1, 8, 'TT')]})
+
+
+    def test_separate_clump_coordinates(self):
+        clumps = genetics.kmer_clumps('AAACCCCCCCCCCAAA', [(1, 3, 3)], coordinates = True)
+
+        self.assertEqual(clumps[(1, 3, 3)], [(0, 3, 'A'), (3, 13, 'C'), (13, 16, 'A')])
+
+
+if __name__ == '__main__':
+    unittest.main()